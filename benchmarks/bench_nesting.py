@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+##########################################################################################
+# rms-pdstemplate/benchmarks/bench_nesting.py
+##########################################################################################
+"""Benchmark of label generation from deeply nested templates.
+
+Every string of label content is passed once to a single output function, regardless of
+how deeply nested its $FOR and $IF blocks are. As a result, the time per output string
+should be nearly independent of the nesting depth. Run::
+
+    python benchmarks/bench_nesting.py [--depth N] [--repeat N]
+"""
+
+import argparse
+
+from bench_suite import best_time       # also puts the repository on the path
+
+import pdslogger
+from pdstemplate import PdsTemplate
+
+
+def nested_template(depth, width):
+    """Template content with `depth` levels of nested $FOR and $IF blocks."""
+
+    lines = []
+    for level in range(depth):
+        lines.append(f'$FOR(V{level}=range({width}))')
+        lines.append('$IF(True)')
+    lines.append('<item>$' + '+'.join(f'V{k}' for k in range(depth)) + '$</item>')
+    for level in range(depth):
+        lines.append('$END_IF')
+        lines.append('$END_FOR')
+
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark nested templates')
+    parser.add_argument('--depth', type=int, default=6, help='maximum nesting depth')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions per case')
+    args = parser.parse_args()
+
+    PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+    # Keep the number of output strings roughly constant as the depth increases
+    target = 20000
+    print(f'{"depth":>5} {"engine":>9} {"strings":>8} {"seconds":>9} {"ns/string":>10}')
+    for depth in range(1, args.depth + 1):
+        width = max(2, round(target ** (1./depth)))
+        content = nested_template(depth, width)
+        for engine in ('interpret', 'codegen'):
+            template = PdsTemplate('nested.txt', content=content, engine=engine)
+
+            # Three strings are output for each <item>
+            strings = 3 * width**depth
+
+            (best, _) = best_time(lambda: template.generate({}), args.repeat)
+            print(f'{depth:5d} {engine:>9} {strings:8d} {best:9.4f} '
+                  f'{1.e9 * best / strings:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
+
+##########################################################################################
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+##########################################################################################
+# rms-pdstemplate/benchmarks/bench_suite.py
+##########################################################################################
+"""Benchmark suite for the template engine.
+
+Each case is a template that stresses one feature of the engine, plus three realistic
+templates from the test files. For each case and engine, the suite reports:
+
+- construct: the time to construct the PdsTemplate, without the compiled-template cache;
+- generate: the time to generate one label;
+- peak: the peak memory allocated while generating one label, as measured by tracemalloc;
+- chars: the length of the label;
+- errors: the number of errors and fatal errors logged, which should be zero except in
+  the "degraded" case.
+
+Times are the best of several repetitions. The synthetic templates are generated from a
+fixed random seed, so the numbers are comparable between runs on the same machine. Run::
+
+    python benchmarks/bench_suite.py [--case NAME ...] [--engine NAME ...] [--scale X]
+                                     [--repeat N] [--json FILE]
+
+Use --scale to make every synthetic template larger or smaller, and --json to save the
+results, along with the Python version and platform, for later comparison.
+
+The other scripts in this directory measure narrower aspects of the engine. They import
+their timing function from this one.
+"""
+
+import argparse
+import json
+import pathlib
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import pdslogger                                                    # noqa: E402
+from pdstemplate import PdsTemplate, __version__                    # noqa: E402
+from pdstemplate.pds3table import Pds3Table                         # noqa: E402
+
+TEST_FILES = REPO_ROOT / 'test_files'
+SEED = 20251017
+
+##########################################################################################
+# Synthetic cases
+##########################################################################################
+# Each function receives the scale factor and a temporary directory, and returns a tuple
+# (template path, template content, constructor options, dictionary, label path).
+
+
+def case_substitutions(scale, temp_dir):
+    """Thousands of plain substitutions of dictionary values."""
+
+    count = int(5000 * scale)
+    lines = [f'KEYWORD_{k:05d} = $value{k}$' for k in range(count)]
+    dictionary = {f'value{k}': f'VALUE_{k}' for k in range(count)}
+    return ('subs.lbl', '\n'.join(lines) + '\n', {}, dictionary, 'subs.lbl')
+
+
+def case_nested_for(scale, temp_dir):
+    """Three levels of nested $FOR loops."""
+
+    width = max(2, round(20 * scale ** (1/3)))
+    content = ('$FOR(a=range(n))\nOBJECT = A_$a$\n'
+               '$FOR(b=range(n))\n  OBJECT = B_$b$\n'
+               '$FOR(c=range(n))\n    VALUE_$c$ = $a*n*n + b*n + c$\n$END_FOR\n'
+               '  END_OBJECT = B_$b$\n$END_FOR\n'
+               'END_OBJECT = A_$a$\n$END_FOR\n')
+    return ('nested.lbl', content, {}, {'n': width}, 'nested.lbl')
+
+
+def case_if_chain(scale, temp_dir):
+    """A long $IF/$ELSE_IF chain evaluated inside a loop."""
+
+    branches = 50
+    lines = ['$FOR(x=items)', '$IF(x == 0)', 'ZERO']
+    lines += [f'$ELSE_IF(x == {k})\nBRANCH_{k} = $x$' for k in range(1, branches)]
+    lines += ['$ELSE', 'OTHER = $x$', '$END_IF', '$END_FOR']
+    rng = random.Random(SEED)
+    items = [rng.randrange(branches + 10) for _ in range(int(2000 * scale))]
+    return ('if_chain.lbl', '\n'.join(lines) + '\n', {}, {'items': items},
+            'if_chain.lbl')
+
+
+def case_include(scale, temp_dir):
+    """A dynamic $INCLUDE, selected by an expression, inside a loop."""
+
+    for k in range(4):
+        lines = [f'  PART_{k}_{j} = $x + {j}$' for j in range(10)]
+        (temp_dir / f'part{k}.txt').write_text('\n'.join(lines) + '\n')
+
+    content = '$FOR(x=range(n))\nOBJECT = $x$\n$INCLUDE(f"part{x % 4}.txt")\n$END_FOR\n'
+    template_path = str(temp_dir / 'include.lbl')
+    return (template_path, content, {}, {'n': int(500 * scale)}, template_path)
+
+
+def case_xml_escape(scale, temp_dir):
+    """A PDS4 table label in which some values must be escaped."""
+
+    content = ('<?xml version="1.0" encoding="UTF-8"?>\n<Product_Observational>\n'
+               '$FOR(row=rows)\n  <Field_Character>\n'
+               '    <name>$row["name"]$</name>\n'
+               '    <field_number>$row["number"]$</field_number>\n'
+               '    <description>$row["description"]$</description>\n'
+               '  </Field_Character>\n$END_FOR\n</Product_Observational>\n')
+    rows = [{'name': f'COLUMN_{k}', 'number': k + 1,
+             'description': (f'Value of column {k}' if k % 4 else
+                             f'Value of column {k} where x < y & y > 0')}
+            for k in range(int(2000 * scale))]
+    return ('escape.xml', content, {'xml': True}, {'rows': rows}, 'escape.xml')
+
+
+def case_crlf(scale, temp_dir):
+    """<CR><LF> output, including wrapped text containing newlines."""
+
+    content = ('$FOR(k=range(n))\nOBJECT = ITEM_$k$\n'
+               '  DESCRIPTION = "$WRAP(17, 78, text)$"\nEND_OBJECT = ITEM_$k$\n'
+               '$END_FOR\n')
+    text = ' '.join(f'word{k}' for k in range(40))
+    return ('crlf.lbl', content, {'crlf': True}, {'n': int(1000 * scale), 'text': text},
+            'crlf.lbl')
+
+
+def case_floats(scale, temp_dir):
+    """Formatting of many floating-point values."""
+
+    rng = random.Random(SEED)
+    values = []
+    for k in range(int(5000 * scale)):
+        if k % 3 == 0:
+            values.append(round(rng.uniform(-1000, 1000), 3))
+        elif k % 3 == 1:
+            values.append(0.1 * k + 0.2)            # e.g., 0.30000000000000004
+        else:
+            values.append(rng.uniform(-1, 1) * 10.**rng.randrange(-30, 30))
+
+    content = '$FOR(v=values)\nVALUE_$INDEX$ = $v$\n$END_FOR\n'
+    return ('floats.lbl', content, {'upper_e': True}, {'values': values},
+            'floats.lbl')
+
+
+def case_degraded(scale, temp_dir):
+    """A table whose data are partly invalid, so that many expressions raise errors."""
+
+    rng = random.Random(SEED)
+    values = [rng.choice([0, None, 'N/A']) if k % 5 == 0 else rng.uniform(1, 100)
+              for k in range(int(2000 * scale))]
+    content = ('$FOR(v=values)\nOBJECT = COLUMN_$INDEX$\n  RATIO = $100/v$\n'
+               '  ROUNDED = $round(v, 2)$\nEND_OBJECT = COLUMN_$INDEX$\n$END_FOR\n')
+    return ('degraded.lbl', content, {}, {'values': values}, 'degraded.lbl')
+
+##########################################################################################
+# Cases based on the test files
+##########################################################################################
+
+
+def case_covims_index(scale, temp_dir):
+    """The COVIMS_0094 index label, which analyzes a table file and validates the
+    label."""
+
+    # The Pds3Table defines the functions used by the template, e.g., LABEL_VALUE
+    Pds3Table(TEST_FILES / 'COVIMS_0094_index.lbl')
+    shutil.copy(TEST_FILES / 'COVIMS_0094_index.tab', temp_dir / 'bench.tab')
+    template_path = TEST_FILES / 'COVIMS_0094_index_template.txt'
+    content = template_path.read_bytes().decode('latin-1')
+    return (template_path, content, {'crlf': True}, {}, str(temp_dir / 'bench.lbl'))
+
+
+def case_xml_template(scale, temp_dir):
+    """The XML test template."""
+
+    template_path = TEST_FILES / 'xml_template.xml'
+    return (template_path, '', {}, {'escape_text': '<&>'}, 'xml_output.txt')
+
+
+def case_functions_template(scale, temp_dir):
+    """The test template that calls every predefined function."""
+
+    text_data_file = temp_dir / 'data_file.txt'
+    text_data_file.write_bytes(b'Lorem ipsum dolor sit amet,\nconsectetur adipiscing\n')
+    dictionary = {'bin_data_file': str(TEST_FILES / 'data_file.bin'),
+                  'text_data_file': str(text_data_file),
+                  'for_list': ['a', 'b', 'c']}
+    template_path = TEST_FILES / 'functions_template.txt'
+    return (template_path, '', {}, dictionary, 'functions_output.txt')
+
+
+CASES = {
+    'substitutions': case_substitutions,
+    'nested_for': case_nested_for,
+    'if_chain': case_if_chain,
+    'include': case_include,
+    'xml_escape': case_xml_escape,
+    'crlf': case_crlf,
+    'floats': case_floats,
+    'degraded': case_degraded,
+    'covims_index': case_covims_index,
+    'xml_template': case_xml_template,
+    'functions_template': case_functions_template,
+}
+
+##########################################################################################
+# Measurement
+##########################################################################################
+
+
+def best_time(func, repeat):
+    """The shortest time of several calls to a function, and the last result."""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return (best, result)
+
+
+def peak_memory(func):
+    """The peak memory in bytes allocated during a call to a function."""
+
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(name, engine, scale, repeat):
+    """Measure one case with one engine, returning a dictionary of results."""
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        (template_path, content, options,
+         dictionary, label_path) = CASES[name](scale, pathlib.Path(temp_dir))
+
+        def construct():
+            return PdsTemplate(template_path, content=content, engine=engine,
+                               cache_dir='', **options)
+
+        (construct_time, template) = best_time(construct, repeat)
+        (generate_time, label) = best_time(lambda: template.generate(dictionary,
+                                                                     label_path),
+                                           repeat)
+        errors = template.fatal_count + template.error_count
+        peak = peak_memory(lambda: template.generate(dictionary, label_path))
+
+    return {'case': name, 'engine': engine, 'construct': construct_time,
+            'generate': generate_time, 'peak': peak, 'chars': len(label),
+            'errors': errors}
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark suite for pdstemplate')
+    parser.add_argument('--case', nargs='+', choices=list(CASES), default=list(CASES),
+                        help='cases to run; default is all')
+    parser.add_argument('--engine', nargs='+', choices=['interpret', 'codegen'],
+                        default=['interpret', 'codegen'], help='engines to compare')
+    parser.add_argument('--scale', type=float, default=1.,
+                        help='size factor for the synthetic templates')
+    parser.add_argument('--repeat', type=int, default=5, help='repetitions per case')
+    parser.add_argument('--json', type=pathlib.Path, help='file in which to save results')
+    args = parser.parse_args()
+
+    PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+    print(f'pdstemplate {__version__}; Python {platform.python_version()}; '
+          f'{platform.platform()}')
+    print(f'{"case":>18} {"engine":>9} {"construct(ms)":>13} {"generate(ms)":>12} '
+          f'{"peak(KiB)":>10} {"chars":>9} {"errors":>6}')
+
+    results = []
+    for name in args.case:
+        for engine in args.engine:
+            result = run_case(name, engine, args.scale, args.repeat)
+            results.append(result)
+            print(f'{name:>18} {engine:>9} {1000 * result["construct"]:13.2f} '
+                  f'{1000 * result["generate"]:12.2f} {result["peak"] / 1024:10.1f} '
+                  f'{result["chars"]:9d} {result["errors"]:6d}')
+
+    if args.json:
+        record = {'version': __version__, 'python': platform.python_version(),
+                  'platform': platform.platform(), 'scale': args.scale,
+                  'repeat': args.repeat, 'results': results}
+        args.json.write_text(json.dumps(record, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
+
+##########################################################################################
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+##########################################################################################
+# rms-pdstemplate/benchmarks/bench_xml_escape.py
+##########################################################################################
+"""Benchmark of the formatting and XML escaping of substituted values.
+
+This compares _PdsBlock.format_value() with the previous implementation, which always
+called xml.sax.saxutils.escape(), over the values substituted into a PDS4 template with
+thousands of substitutions, and then times the generation of the complete label. Run::
+
+    python benchmarks/bench_xml_escape.py [--rows N] [--repeat N]
+"""
+
+import argparse
+from xml.sax.saxutils import escape
+
+from bench_suite import best_time       # also puts the repository on the path
+
+import pdslogger
+from pdstemplate import PdsTemplate
+from pdstemplate._pdsblock import _PdsBlock
+from pdstemplate.utils import _NOESCAPE_FLAG
+
+TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<Product_Observational>
+$FOR(row=rows)
+  <Field_Character>
+    <name>$row['name']$</name>
+    <field_number>$row['number']$</field_number>
+    <field_location unit="byte">$row['offset']$</field_location>
+    <data_type>ASCII_Real</data_type>
+    <field_length unit="byte">$row['width']$</field_length>
+    <scaling_factor>$row['scale']$</scaling_factor>
+    <description>$row['description']$</description>
+  </Field_Character>
+$END_FOR
+</Product_Observational>
+"""
+
+
+def old_format_value(value, xml, upper_e):
+    """The previous implementation of _PdsBlock.format_value()."""
+
+    if isinstance(value, float):
+        value = _PdsBlock._pretty_truncate(value, upper_e)
+    else:
+        value = str(value)
+
+    if xml:
+        if value.startswith(_NOESCAPE_FLAG):
+            value = value[len(_NOESCAPE_FLAG):]
+        else:
+            value = escape(value)
+
+    return value
+
+
+def make_rows(count):
+    """Dictionary values resembling those of a large table label."""
+
+    rows = []
+    for k in range(count):
+        rows.append({'name': f'COLUMN_{k}', 'number': k + 1, 'offset': 10*k + 1,
+                     'width': 9, 'scale': 0.001 * (k % 7 + 1),
+                     'description': (f'Value of column {k}' if k % 10 else
+                                     f'Value of column {k} where x < y & y > 0')})
+    return rows
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark XML escaping')
+    parser.add_argument('--rows', type=int, default=2000, help='rows in the table')
+    parser.add_argument('--repeat', type=int, default=20, help='repetitions per case')
+    args = parser.parse_args()
+
+    PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+    rows = make_rows(args.rows)
+    values = [value for row in rows for value in row.values()]
+    print(f'{len(values)} substituted values')
+
+    # Floats are dominated by their formatting, so also time the other values separately
+    others = [value for value in values if not isinstance(value, float)]
+    for (subset, label) in [(values, 'all'), (others, 'non-float')]:
+        for (version, func) in [('old', old_format_value),
+                                ('new', _PdsBlock.format_value)]:
+            (elapsed, _) = best_time(lambda: [func(v, True, False) for v in subset],
+                                     args.repeat)
+            per_value = 1.e9 * elapsed / len(subset)
+            print(f'{version + " " + label:>20}: {elapsed:8.4f} s  '
+                  f'{per_value:7.1f} ns/value')
+
+    for engine in ('interpret', 'codegen'):
+        template = PdsTemplate('table.xml', content=TEMPLATE, engine=engine)
+        (elapsed, _) = best_time(lambda: template.generate({'rows': rows}),
+                                 args.repeat)
+        print(f'{"generate " + engine:>20}: {elapsed:8.4f} s')
+
+
+if __name__ == '__main__':
+    main()
+
+##########################################################################################
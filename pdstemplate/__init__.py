@@ -33,6 +33,15 @@ Once the template has been constructed, steps 2 and 3 can be repeated any number
 Alternatively, you can obtain the content of a label without writing it to a file using
 method :meth:`~PdsTemplate.generate`.
 
+For very large labels, method :meth:`~PdsTemplate.generate_iter` returns the content
+piece by piece as it is generated, and ``write(..., stream=True)`` writes each piece to
+the file as soon as it is available, so the complete label is never held in memory.
+
+To write a large number of labels from the same template, use method
+:meth:`~PdsTemplate.write_many`, which distributes the work across multiple processes::
+
+    template.write_many([(dictionary1, label_file1), (dictionary2, label_file2), ...])
+
 ``pdstemplate`` employs the RMS Node's `rms-filecache
 <https://pypi.org/project/rms-filecache>`_ module and its `FCPath
 <https://rms-filecache.readthedocs.io/en/latest/module.html#filecache.file_cache_path.FCPath>`_
@@ -115,6 +124,10 @@ variable names are assigned:
 - `INDEX` = the index of this iteration, starting from zero;
 - `LENGTH` = the total number of iterations.
 
+The iterable is traversed one item at a time, so a generator or other streamed source is
+never held in memory all at once. The exception is a loop in which `LENGTH` is used and
+the iterable does not support ``len()``; in that case, it is converted to a list first.
+
 For example, if::
 
     dictionary["targets"] = ["Jupiter", "Io", "Europa"]
@@ -200,7 +213,10 @@ Include files are handled somewhat differently from other headers. When ``INCLUD
 references a file as a literal string rather than as an expression to evaluate, it is
 processed at the time that the :class:`PdsTemplate` is constructed. However, if the
 filename is given as an expression, it is not evaluated until :meth:`~PdsTemplate.write``
-or :meth:`~PdsTemplate.generate`` is called for each label.
+or :meth:`~PdsTemplate.generate`` is called for each label. In this case, the compiled
+content of each file is saved inside the :class:`PdsTemplate` and re-used for later
+labels, as long as the file's modification time and size are unchanged. Use the
+`include_cache` input to the constructor to skip this check or to disable the re-use.
 
 =================
 NOTE and END_NOTE
@@ -324,10 +340,28 @@ also set the logging level ("info", "warning", "error", etc.) using
 :meth:`~utils.set_log_level` and can select among many log formatting options using
 :meth:`~set_log_format`. Use :meth:`~utils.get_logger` to obtain the current Logger.
 
+Labels can be generated concurrently in multiple threads, for example using a
+``concurrent.futures.ThreadPoolExecutor``. Within a thread other than the main thread,
+each label is logged by a child of the current Logger that is unique to that thread, so
+that the message counts for each label remain separate.
+
+Programs based on ``asyncio`` can use the coroutines :meth:`~PdsTemplate.agenerate`,
+:meth:`~PdsTemplate.awrite`, and :meth:`~PdsTemplate.awrite_many`. Each label is generated
+and written in a thread of the event loop's default executor, so the reading and writing
+of remote files, such as labels in a cloud bucket, overlap rather than happening one at a
+time.
+
+When writing a large batch of labels, use the context manager
+:func:`~utils.quiet_logging`, or the ``quiet`` option of :meth:`~PdsTemplate.write_many`,
+to reduce the logging overhead. Within it, only warnings and errors are logged for each
+label, and a single summary is logged for the batch.
+
 By default, exceptions during a call to :meth:`~PdsTemplate.write` or
 :meth:`~PdsTemplate.generate` are handled as follows:
 
-1. They are written to the log.
+1. They are written to the log, identifying the expression, its file name and line
+   number, and, for an expression in the body text, the column of its opening "$"; for
+   example, "t.xml:4:9".
 2. The expression that triggered the exception is replaced by the error text in the label,
    surrounded by "[[[" and "]]]" to make it easier to find.
 3. The attributes ``fatal_count``, ``error_count``, and ``warning_count`` of the
@@ -338,6 +372,12 @@ This behavior can be modified using ``raise_exceptions=True`` in the call to
 :meth:`~PdsTemplate.write` or :meth:`~PdsTemplate.generate`; in this case, the exception
 will be raised, label generation will stop, and the label will not be written.
 
+An expression that is not valid Python is an exception to these rules. Every expression is
+compiled when the template is constructed, and if any of them are invalid, the constructor
+raises a :class:`TemplateError` listing all of them, each with its file name, line number,
+and, in the body text, column. Use :meth:`~PdsTemplate.undefined_names` to list the names
+that a template uses but does not define, all of which must be provided by the dictionary.
+
 ##############
 Pre-processors
 ##############
@@ -368,19 +408,87 @@ additional arguments; define them using lambda notation instead.
 Note that a :class:`PdsTemplate` object has an attribute `content`, which contains the
 full content of the template after all pre-processing has been performed. You can examine
 this attribute to see the final result of all processing. Note also that when line numbers
-appear in an error message, they refer to the line number of the template after
-pre-processing, not before.
+and columns appear in an error message, they refer to the template after pre-processing,
+not before.
+
+##############
+Template Cache
+##############
+
+Compiling a large template takes time, and this cost is repeated every time a program
+constructs a :class:`PdsTemplate`. To avoid it, use the `cache_dir` input to the
+constructor or the environment variable ``PDSTEMPLATE_CACHE`` to specify a local
+directory in which compiled templates are saved. When the same template is constructed
+again, in the same process or another one, the compiled form is read from this directory
+instead.
+
+A cached template is identified by the content of the template after all pre-processing,
+including the content of any file named explicitly in an ``INCLUDE`` header, along with
+the template's path and the version of this module. Pre-processors are still applied on
+every construction, because their output is needed to check the cache. Files included via
+an expression are read when the label is generated, so they are never cached. Files in the
+cache directory can be deleted at any time.
+
+The content of the labels themselves can also be cached, using the `render_cache` input
+to the constructor. When the template is constructed, its expressions are analyzed to
+determine which dictionary keys they use. A label is then retrieved from the cache if the
+values of those keys, the label path, and the template are the same as when it was last
+generated without any warnings or errors. Labels that depend on functions with side
+effects or external state, such as ``FILE_BYTES``, ``CURRENT_TIME``, or ``COUNTER``, or
+on any other function not defined in the dictionary, are always generated anew, as are the
+labels of any template that contains an expression in an ``INCLUDE`` header. Dictionary
+values must be picklable to be compared, and an object's methods are assumed to depend
+only on the object's pickled state. The module, name, and bytecode of each predefined
+function used are also compared, so a function redefined via
+:meth:`~PdsTemplate.define_global` does not match labels cached before.
+
+A program that generates labels from a handful of shared templates can avoid constructing
+them repeatedly by calling :meth:`~PdsTemplate.get` instead of the constructor. It returns
+the template constructed earlier in the same process from the same path and options, as
+long as the file's modification time and size are unchanged or, if the `content` input is
+used, the content is the same. The least recently used templates are discarded once 32
+are retained; use :meth:`~PdsTemplate.set_registry_size` to change this limit.
+
+#########
+Profiling
+#########
+
+To find out which parts of a slow template take the most time, set the template's
+`profile` attribute to True, or generate the labels inside the context manager
+:meth:`~PdsTemplate.profiling`. For each expression and for each block of the template,
+identified by its file name, line number, and header, the template then records the
+number of evaluations, the total and maximum time, and the number of characters written
+into the label. :meth:`~PdsTemplate.profile_report` returns these statistics as a table,
+ranked by total time::
+
+    with template.profiling():
+        template.write(dictionary, label_path)
+
+While profiling is enabled, labels are generated by the interpreter, never from the
+render cache.
 """
 
+import asyncio
+import builtins
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
 import datetime
+import filecmp
 import hashlib
+import logging
 import numbers
 import os
+import pathlib
+import pickle
 import re
 import string
+import sys
+import tempfile
 import textwrap
+import threading
 import time
-from collections import deque
 
 from filecache import FCPath
 import julian
@@ -395,8 +503,17 @@ from .utils import TemplateError, TemplateAbort                     # noqa: F401
     # Unused here but included to support "from pdstemplate import TemplateError", etc.
 
 from .utils import _RaisedException, _NOESCAPE_FLAG
-from .utils import set_logger, get_logger, set_log_level, set_log_format
+from .utils import set_logger, get_logger, set_log_level, set_log_format, quiet_logging
+from .utils import _use_thread_logger, _BATCH_COUNTER, _count_label
 from ._pdsblock import _PdsBlock, _PdsIncludeBlock
+from ._codegen import _generate_renderer
+from ._folding import _fold_constants
+from ._dependencies import _STATIC_NAMES, _static_identity, _template_dependencies
+from ._includes import _IncludeResolver, _file_stamp
+from ._cache import _cache_dir, _cache_key, _load_blocks, _save_blocks
+from ._cache import _load_render, _save_render
+from ._manifest import _Manifest
+from ._profile import _Profile
 
 
 class PdsTemplate:
@@ -407,16 +524,37 @@ class PdsTemplate:
 
     # We need to handle certain attributes as class variables because we need to support
     # the various default functions such as LABEL_PATH(), etc., and these function execute
-    # within a template without any associated context. Therefore, the PdsTemplate module
-    # cannot operate in a multi-threaded environment!
-    _CURRENT_TEMPLATE = None
-    _CURRENT_LABEL_PATH = ''
-    _CURRENT_GLOBAL_DICT = {}
+    # within a template without any associated context. They are context variables, and
+    # each call to generate() or write() runs in its own copy of the current context, so
+    # labels can be generated concurrently in multiple threads.
+    _CURRENT_TEMPLATE = contextvars.ContextVar('pdstemplate_template', default=None)
+    _CURRENT_LABEL_PATH = contextvars.ContextVar('pdstemplate_label_path', default='')
+    _CURRENT_GLOBAL_DICT = contextvars.ContextVar('pdstemplate_global_dict', default=None)
 
     _GETENV_INCLUDE_DIRS = None
 
+    _ENGINES = {'interpret', 'codegen'}
+    _INCLUDE_CACHE_MODES = {'check', 'static', 'off'}
+    _WRITE_MODES = {'save', 'repair', 'validate', 'sync'}
+
+    # When streaming, the minimum number of output strings to accumulate before writing
+    _STREAM_FLUSH = 1000
+
+    # Templates returned by get(), least recently used first, keyed by (path, modification
+    # time and size or content digest, options)
+    _REGISTRY = collections.OrderedDict()
+    _REGISTRY_LOCK = threading.Lock()
+    _REGISTRY_SIZE = 32
+
+    # Incremented by each call to define_global(); for each name redefined, the version at
+    # which it was last defined
+    _GLOBALS_VERSION = 0
+    _REDEFINED_GLOBALS = {}
+
     def __init__(self, template, content='', *, xml=None, crlf=None, upper_e=False,
-                 includes=[], preprocess=None, args=(), kwargs={}, postprocess=None):
+                 includes=[], preprocess=None, args=(), kwargs={}, postprocess=None,
+                 engine='interpret', cache_dir=None, include_cache='check',
+                 list_includes=False, render_cache=None):
         """Construct a PdsTemplate object from the contents of a template file.
 
         Parameters:
@@ -469,19 +607,65 @@ class PdsTemplate:
 
                 For example, use `postprocess=ps3_syntax_checker` to ensure a generated
                 label strictly conforms to the PDS3 standard.
+            engine (str, optional):
+                "interpret" to generate each label by walking the compiled template
+                structure; "codegen" to translate the template into a single generated
+                Python function when it is constructed, which reduces the overhead per
+                label for large and loop-heavy templates. The content of the labels and
+                the handling of errors are the same for both.
+            cache_dir (str or Path, optional):
+                A local directory in which to save the compiled form of the template, so
+                that later constructions of the same template, in this or another
+                process, can skip compilation. If not specified, the value of the
+                environment variable "PDSTEMPLATE_CACHE" is used; if that is also
+                undefined or empty, no cache is used.
+            include_cache (str, optional):
+                How to cache files read by $INCLUDE headers whose file names are
+                expressions. "check" to re-use a compiled file as long as its location,
+                modification time, and size are unchanged; "static" to re-use a compiled
+                file without checking it again, which is suitable when include files do
+                not change during the life of this object; "off" to read and compile the
+                file each time it is included.
+            list_includes (bool, optional):
+                True to list the content of each include directory once, the first time
+                it is searched, rather than checking for each include file separately.
+                This is faster when there are several include directories, especially
+                remote ones, but files added to a directory afterward will not be found.
+            render_cache (str or Path, optional):
+                A local directory in which to save generated label content, keyed by the
+                dictionary values the template uses. Labels that would be unchanged are
+                then retrieved from this directory rather than generated again.
         """
 
+        # Save the inputs so the template can be re-constructed in another process
+        self._constructor_args = (template, content,
+                                  dict(xml=xml, crlf=crlf, upper_e=upper_e,
+                                       includes=includes, preprocess=preprocess,
+                                       args=args, kwargs=kwargs, postprocess=postprocess,
+                                       engine=engine, cache_dir=cache_dir,
+                                       include_cache=include_cache,
+                                       list_includes=list_includes,
+                                       render_cache=render_cache))
+
+        if engine not in PdsTemplate._ENGINES:
+            raise ValueError('invalid engine value: ' + repr(engine))
+        if include_cache not in PdsTemplate._INCLUDE_CACHE_MODES:
+            raise ValueError('invalid include_cache value: ' + repr(include_cache))
+
         self.template_path = FCPath(template)
-        PdsTemplate._CURRENT_TEMPLATE = self
-        PdsTemplate._CURRENT_LABEL_PATH = ''
-        PdsTemplate._CURRENT_GLOBAL_DICT = {}
+        context_before = contextvars.copy_context()
+        PdsTemplate._CURRENT_TEMPLATE.set(self)
 
         includes = includes if isinstance(includes, (list, tuple)) else [includes]
         self._includes = [FCPath(dir) for dir in includes]
+        self._resolver = _IncludeResolver(self._include_dirs(), listing=list_includes)
 
         self.upper_e = bool(upper_e)
         self.postprocess = postprocess
 
+        self.include_cache = include_cache
+        self._include_cache = {}    # (filename, filepath) -> ((path, stamp), blocks)
+
         logger = get_logger()
         logger.info('New PdsTemplate', self.template_path)
         try:
@@ -533,6 +717,7 @@ class PdsTemplate:
             # problem. DISABLED for now.
             # self._include_more_error_info = (content != before)
             self._include_more_error_info = False
+            self._line_offsets = None       # see _content_line()
 
             # Detect XML if not specified
             if xml is None:
@@ -540,18 +725,96 @@ class PdsTemplate:
             else:
                 self.xml = xml
 
-            # Compile into a deque of _PdsBlock objects
-            self._blocks = _PdsBlock.process_headers(content, self)
+            # Compile into a deque of _PdsBlock objects, using the cache if available
+            cache_dir = _cache_dir(cache_dir)
+            blocks = None
+            if cache_dir:
+                key = _cache_key(self, content, __version__)
+                blocks = _load_blocks(cache_dir, key, self)
+
+            if blocks is None:
+                blocks = _PdsBlock.process_headers(content, self)
+                if cache_dir:
+                    _save_blocks(cache_dir, key, self, blocks)
+
+            self._blocks = blocks
+
+            # Evaluate constant expressions now rather than once per label
+            self._globals_version = PdsTemplate._GLOBALS_VERSION
+            self._folded_names = _fold_constants(self, blocks)
+
+            # Determine the dependencies of the content if the render cache is used
+            self._render_cache = pathlib.Path(render_cache) if render_cache else None
+            self._render_dependencies = None
+            if self._render_cache:
+                dependencies = _template_dependencies(blocks)
+                if dependencies is None:
+                    logger.info('Render cache disabled; template dependencies are '
+                                'unknown', self.template_path)
+                else:
+                    (loaded, assigned) = dependencies
+                    self._render_dependencies = (sorted(loaded), assigned | _STATIC_NAMES)
+                    hasher = hashlib.sha256()
+                    for part in (__version__, str(self.template_path), content,
+                                 repr(self.xml), repr(self.upper_e),
+                                 repr(self.terminator)):
+                        hasher.update(part.encode('utf-8'))
+                        hasher.update(b'\0')
+                    self._render_prefix = hasher.hexdigest()
+
+            # Translate the blocks into a single Python function if requested
+            self.engine = engine
+            self._renderer = None
+            self._renderer_source = ''
+            if engine == 'codegen':
+                logger.debug('Generating code', self.template_path)
+                (self._renderer,
+                 self._renderer_source) = _generate_renderer(self, self._blocks)
 
         except Exception as err:
             logger.exception(err, self.template_path)
             raise
 
+        # Context variables set during construction, e.g., by a preprocessor, are restored
+        # whenever a label is generated, regardless of the thread
+        self._context_values = {var: value
+                                for var, value in contextvars.copy_context().items()
+                                if var not in context_before
+                                or context_before[var] is not value}
+
         # For managing errors and warnings raised during generate()
         self.fatal_count = 0
         self.error_count = 0
         self.warning_count = 0
 
+        # True to record the time spent in each expression and block
+        self.profile = False
+        self._profile = _Profile()
+
+    def _content_line(self, line):
+        """The text of one line of the template content, without its terminator.
+
+        The offset of every line is found the first time this is called, so that runs
+        producing many errors do not split the entire content for each one.
+
+        Parameters:
+            line (int): Line number in the template content, starting from 1.
+
+        Returns:
+            str: The text of the line; an empty string if the line does not exist.
+        """
+
+        if self._line_offsets is None:
+            self._line_offsets = [0] + [match.end() for match
+                                        in re.finditer('\n', self.content)]
+
+        if not 1 <= line <= len(self._line_offsets):
+            return ''
+
+        start = self._line_offsets[line-1]
+        end = self.content.find('\n', start)
+        return self.content[start:] if end < 0 else self.content[start:end]
+
     def _include_dirs(self):
         """Ordered list of all include directories to search."""
 
@@ -577,7 +840,7 @@ class PdsTemplate:
         parts = PdsTemplate._INCLUDE_REGEX.split(content)
         for k, part in enumerate(parts):
             if k % 2 == 1:
-                part = _PdsIncludeBlock.get_content(part[1:-1], self._include_dirs())
+                part = _PdsIncludeBlock.get_content(part[1:-1], self._resolver)
                 part = self._preprocess_includes(part)      # process recursively
                 parts[k] = part
 
@@ -598,6 +861,24 @@ class PdsTemplate:
 
         return False
 
+    def undefined_names(self):
+        """The names used by this template that it does not define.
+
+        These are the names referred to by the template's expressions that are neither
+        predefined functions, Python builtins, symbols defined via :meth:`define_global`,
+        nor names assigned within the template itself. Each must be provided by the
+        dictionary when a label is generated. The content of any file included via an
+        expression is unknown, so names used only there are not included.
+
+        Returns:
+            list[str]: The names in alphabetical order.
+        """
+
+        (loaded, assigned) = _template_dependencies(self._blocks, includes=True)
+        defined = assigned | set(PdsTemplate._PREDEFINED_BUILTINS)
+        defined |= {'hide_warnings', 'abort_on_error'}      # defined by generate()
+        return sorted(loaded - defined)
+
     def generate(self, dictionary, label_path='', *, raise_exceptions=False,
                  hide_warnings=False, abort_on_error=False):
         """Generate the content of one label based on the template and dictionary.
@@ -622,59 +903,259 @@ class PdsTemplate:
             str: The generated content.
         """
 
-        label_path = str(label_path) if label_path else ''
+        (content, counts) = contextvars.copy_context().run(
+                                        self._generate, dictionary, label_path,
+                                        raise_exceptions=raise_exceptions,
+                                        hide_warnings=hide_warnings,
+                                        abort_on_error=abort_on_error)
+        (self.fatal_count, self.error_count, self.warning_count) = counts
+        return content
 
-        # Initialize
-        PdsTemplate._CURRENT_TEMPLATE = self
-        PdsTemplate._CURRENT_LABEL_PATH = label_path
+    def generate_iter(self, dictionary, label_path='', *, raise_exceptions=False,
+                      hide_warnings=False, abort_on_error=False):
+        """Generate the content of one label as a sequence of strings.
 
-        # Add predefined functions to the dictionary
-        global_dict = dictionary.copy()
-        for name, value in PdsTemplate._PREDEFINED_FUNCTIONS.items():
-            if name not in global_dict:
-                global_dict[name] = value
-        global_dict['hide_warnings'] = bool(hide_warnings)
-        global_dict['abort_on_error'] = bool(abort_on_error)
-        PdsTemplate._CURRENT_GLOBAL_DICT = global_dict
+        This is the streaming form of :meth:`generate`. The strings, when concatenated,
+        are identical to the string that :meth:`generate` would return, but the label is
+        never held in memory all at once. The error and warning counts are updated only
+        after the last string has been returned. Note that if this template has a
+        postprocess function, the full content is accumulated anyway so that it can be
+        passed to the function.
 
-        state = _LabelState(self, global_dict, label_path,
-                            raise_exceptions=raise_exceptions)
+        Parameters:
+            dictionary (dict):
+                The dictionary of parameters to replace in the template.
+            label_path (str, Path, or FCPath, optional):
+                The output label file path. Although a file is not written, this path is
+                used in error messages.
+            raise_exceptions (bool, optional):
+                True to raise any exceptions encountered; False to log them and embed the
+                error message into the label surrounded by "[[[" and "]]]".
+            hide_warnings (bool, optional):
+                True to hide warning messages.
+            abort_on_error (bool, optional):
+                True to abort the generation process if a validation error is encountered.
 
-        # Generate the label content recursively
-        results = deque()
+        Yields:
+            str: The next part of the generated content.
+        """
+
+        # Each step runs inside this generator's own context, so the caller can do
+        # anything between steps, including generating other labels.
+        context = contextvars.copy_context()
+        counts = []
+        chunks = self._label_chunks(dictionary, label_path, counts,
+                                    raise_exceptions=raise_exceptions,
+                                    hide_warnings=hide_warnings,
+                                    abort_on_error=abort_on_error,
+                                    flush=self._STREAM_FLUSH)
+        try:
+            while True:
+                try:
+                    chunk = context.run(next, chunks)
+                except StopIteration:
+                    break
+                if chunk:
+                    yield chunk
+        finally:
+            context.run(chunks.close)
+
+        (self.fatal_count, self.error_count, self.warning_count) = counts
+
+    def _enter_context(self, label_path=''):
+        """Initialize the current context for the generation of a label."""
+
+        for var, value in self._context_values.items():
+            var.set(value)
+
+        PdsTemplate._CURRENT_TEMPLATE.set(self)
+        PdsTemplate._CURRENT_LABEL_PATH.set(label_path)
+        _use_thread_logger()
+
+    def _generate(self, dictionary, label_path='', *, raise_exceptions=False,
+                  hide_warnings=False, abort_on_error=False):
+        """Internal version of generate(), which must be called within its own context.
+
+        Returns:
+            str: The generated content.
+            tuple: The number of fatal errors, errors, and warnings.
+        """
+
+        counts = []
+        content = ''.join(self._label_chunks(dictionary, label_path, counts,
+                                             raise_exceptions=raise_exceptions,
+                                             hide_warnings=hide_warnings,
+                                             abort_on_error=abort_on_error))
+        return (content, tuple(counts))
+
+    def _label_chunks(self, dictionary, label_path, counts, *, raise_exceptions=False,
+                      hide_warnings=False, abort_on_error=False, flush=None):
+        """Generator of the content of one label, which must be run within its own
+        context.
+
+        The content uses the template's line terminator. If `flush` is None, the complete
+        content is yielded as a single string. Otherwise, the content is yielded in
+        pieces, each as soon as at least `flush` strings have been output since the
+        previous piece. Upon completion, the number of fatal errors, errors, and warnings
+        are appended to the list `counts`.
+        """
+
+        label_path = str(label_path) if label_path else ''
+        self._enter_context(label_path)
+
+        state = _LabelState(self, dictionary, label_path,
+                            raise_exceptions=raise_exceptions)
+        state.global_dict['hide_warnings'] = bool(hide_warnings)
+        state.global_dict['abort_on_error'] = bool(abort_on_error)
+
+        # If the dictionary or define_global() overrides a function used by a constant
+        # expression, the constant must be re-evaluated for each label
+        state.unfold = any(name in dictionary for name in self._folded_names)
+        if not state.unfold and self._globals_version != PdsTemplate._GLOBALS_VERSION:
+            redefined = PdsTemplate._REDEFINED_GLOBALS
+            state.unfold = any(redefined.get(name, 0) > self._globals_version
+                               for name in self._folded_names)
+        PdsTemplate._CURRENT_GLOBAL_DICT.set(state.global_dict)
+
+        # Profile if necessary
+        if self.profile:
+            state.profile = {}
+
+        # Check the render cache
+        render_key = None
+        cached = None
+        if self._render_dependencies and not self.profile:
+            render_key = self._render_key(dictionary, label_path, state.global_dict)
+            if render_key:
+                cached = _load_render(self._render_cache, render_key)
+
+        # Generate the label content recursively; every string goes to state.parts
+        parts = state.parts
+        results = [] if (self.postprocess or render_key) else None
         logger = get_logger()
-        logger.open('Generating label', label_path)
+
+        # With quiet logging, the label gets no tier of its own; its counts are the
+        # change in the counts of the current tier
+        quiet = _BATCH_COUNTER.get() is not None
+        if quiet:
+            before = logger.summarize()
+        else:
+            logger.open('Generating label', label_path)
         try:
-            for block in self._blocks:
-                results += block.execute(state)
-            content = ''.join(results)
-            if self.postprocess:            # postprocess if necessary
-                content = self.postprocess(content)
+            if cached is not None:
+                logger.debug('Label content retrieved from render cache', label_path)
+                parts.append(cached)
+                steps = ()
+            elif self._renderer and not state.unfold and state.profile is None:
+                steps = self._renderer(state)
+            else:
+                steps = (step for block in self._blocks for step in block.execute(state))
+            for _ in steps:
+                if flush and len(parts) >= flush:
+                    chunk = ''.join(parts)
+                    parts.clear()
+                    if results is not None:
+                        results.append(chunk)
+                    yield chunk
+            if self.postprocess and cached is None:     # postprocess if necessary
+                content = ''.join(results + parts)
+                if self.terminator != '\n':
+                    content = content.replace(self.terminator, '\n')
+                self.postprocess(content)
         except TemplateAbort as err:
             logger.fatal('**** ' + err.message, label_path)
         except Exception as err:
             logger.exception(err, label_path)
             raise err
         finally:
-            (fatals, errors, warns, total) = logger.close()
+            if quiet:
+                (fatals, errors, warns, total) = [count - count0 for (count, count0)
+                                                  in zip(logger.summarize(), before)]
+            else:
+                (fatals, errors, warns, total) = logger.close()
+
+        counts += [fatals, errors, warns]
+        if state.profile:
+            self._profile.merge(state.profile)
+        if render_key and cached is None and not (fatals or errors or warns):
+            _save_render(self._render_cache, render_key, ''.join(results + parts))
+
+        yield ''.join(parts)
+
+    def _render_key(self, dictionary, label_path, global_dict):
+        """The key identifying the content of one label in the render cache; None if the
+        content cannot be cached."""
+
+        (names, static_names) = self._render_dependencies
+        values = []
+        for name in names:
+            if name in dictionary:
+                values.append((name, dictionary[name]))
+            elif name in static_names:
+                value = PdsTemplate._PREDEFINED_BUILTINS.get(name)
+                values.append((name, _static_identity(value)))
+            else:
+                return None     # a function with side effects or an undefined name
 
-        content = ''.join(results)
-        self.fatal_count = fatals
-        self.error_count = errors
-        self.warning_count = warns
+        try:
+            data = pickle.dumps((self._render_prefix, label_path,
+                                 global_dict['hide_warnings'],
+                                 global_dict['abort_on_error'], values),
+                                protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
 
-        # Update the terminator if necessary
-        if self.terminator != '\n':
-            content = content.replace('\n', self.terminator)
+        return hashlib.sha256(data).hexdigest()
 
-        # Reset global symbols
-        PdsTemplate._CURRENT_LABEL_PATH = ''
-        PdsTemplate._CURRENT_GLOBAL_DICT = {}
+    def profile_report(self, limit=20, *, reset=False):
+        """A report of the time spent in each expression and block of this template.
 
-        return content
+        The report is a table with one row for each expression and for each block,
+        ranked by total time. Each row contains the total time in seconds, the number of
+        evaluations, the mean and maximum time in milliseconds, the number of characters
+        written into the label, and the location in the template. A block's time
+        includes its body text and embedded expressions, but not its header expression
+        or its nested blocks. Statistics are recorded only while the `profile` attribute
+        of this template is True.
+
+        Parameters:
+            limit (int, optional): The maximum number of rows to include; None for all.
+            reset (bool, optional): True to discard the statistics after the report is
+                created.
+
+        Returns:
+            str: The report.
+        """
+
+        report = self._profile.report(limit)
+        if reset:
+            self._profile.clear()
+        return report
+
+    @contextlib.contextmanager
+    def profiling(self, limit=20, file=None):
+        """Context manager that profiles the labels generated within it and then prints
+        the report.
+
+        Parameters:
+            limit (int, optional): The maximum number of rows to print; None for all.
+            file (file, optional): The file to which to print the report; default is
+                sys.stdout.
+
+        Yields:
+            PdsTemplate: This template.
+        """
+
+        (profile, self.profile) = (self.profile, True)
+        self._profile.clear()
+        try:
+            yield self
+        finally:
+            self.profile = profile
+            print(self.profile_report(limit), end='', file=file or sys.stdout)
 
     def write(self, dictionary, label_path, *, mode='save', backup=False,
-              raise_exceptions=False, handler=None):
+              raise_exceptions=False, handler=None, stream=False):
         """Write one label based on the template, dictionary, and output filename.
 
         Parameters:
@@ -685,7 +1166,12 @@ class PdsTemplate:
             mode (str, optional):
                 "save" to save the new label content regardless of any warnings or errors;
                 "repair" to save the new label if warnings occurred but no errors;
-                "validate" to log errors and warnings but never save the new label file.
+                "validate" to log errors and warnings but never save the new label file;
+                "sync" to save the new label content unless it is identical to that of the
+                file already written by an earlier call in "sync" mode. To determine this
+                without reading the file, a manifest of the content hashes is maintained
+                in a file named ".pdstemplate_manifest.sqlite" within the label's
+                directory.
             backup (bool, optional):
                 If True and an existing file of the same name as label_path already
                 exists, that file is renamed with a suffix indicating its original
@@ -702,16 +1188,31 @@ class PdsTemplate:
                 extension is defined by `label_path`; for example, if handler=".log", then
                 when writing "path/to/123.lbl", the log created will be "path/to/123.log".
                 This log is automatically closed once the label is written.
+            stream (bool, optional):
+                True to write the label content to a temporary file as it is generated,
+                rather than generating the complete content in memory first. The
+                temporary file replaces the label file only if it is to be saved. Use
+                this option for very large labels.
 
         Returns:
             int: Number of errors issued.
             int: Number of warnings issued.
         """
 
-        if mode not in {'save', 'repair', 'validate'}:
+        if mode not in PdsTemplate._WRITE_MODES:
             raise ValueError('invalid mode value: ' + repr(mode))
 
+        return contextvars.copy_context().run(self._write, dictionary, label_path,
+                                              mode=mode, backup=backup,
+                                              raise_exceptions=raise_exceptions,
+                                              handler=handler, stream=stream)
+
+    def _write(self, dictionary, label_path, *, mode='save', backup=False,
+               raise_exceptions=False, handler=None, stream=False):
+        """Internal version of write(), which must be called within its own context."""
+
         label_path = FCPath(label_path)
+        self._enter_context(str(label_path))
 
         logger = get_logger()
         if handler:
@@ -726,14 +1227,26 @@ class PdsTemplate:
                 handler = pdslogger.file_handler(handler)
             logger.add_handler(handler)
 
+        temp_path = None
         try:
-            content = self.generate(dictionary, label_path,
-                                    raise_exceptions=raise_exceptions,
-                                    hide_warnings=(mode == 'save'),
-                                    abort_on_error=(mode != 'save'))
-            fatals = self.fatal_count
-            errors = self.error_count
-            warns = self.warning_count
+            options = dict(raise_exceptions=raise_exceptions,
+                           hide_warnings=(mode in ('save', 'sync')),
+                           abort_on_error=(mode not in ('save', 'sync')))
+            hasher = hashlib.sha256()
+            if stream:
+                content = None
+                counts = []
+                chunks = self._label_chunks(dictionary, label_path, counts,
+                                            flush=self._STREAM_FLUSH, **options)
+                temp_path = self._write_temp_file(label_path, chunks, hasher)
+                counts = tuple(counts)
+            else:
+                (content, counts) = self._generate(dictionary, label_path, **options)
+                if content and not content.endswith(self.terminator):
+                    content += self.terminator
+
+            (self.fatal_count, self.error_count, self.warning_count) = counts
+            (fatals, errors, warns) = counts
 
             if fatals and not errors:
                 errors = fatals
@@ -744,12 +1257,15 @@ class PdsTemplate:
                     plural = 's' if errors > 1 else ''
                     logger.error(f'Validation failed with {errors} error{plural}',
                                  label_path, force=True)
+                    _count_label('invalid')
                 elif warns:
                     plural = 's' if warns > 1 else ''
                     logger.warning(f'Validation failed with {warns} warning{plural}',
                                    label_path, force=True)
+                    _count_label('invalid')
                 else:
                     logger.info('Validation successful', label_path, force=True)
+                    _count_label('valid')
 
             # Repair case
             elif mode == 'repair':
@@ -757,11 +1273,18 @@ class PdsTemplate:
                     plural = 's' if errors > 1 else ''
                     logger.warning(f'Repair failed with {errors} error{plural}',
                                    label_path)
+                    _count_label('not repaired')
                 elif label_path.exists():
-                    old_content = label_path.read_bytes().decode('utf-8')
-                    if old_content == content:
+                    if stream:
+                        unchanged = filecmp.cmp(label_path.retrieve(), temp_path,
+                                                shallow=False)
+                    else:
+                        old_content = label_path.read_bytes().decode('utf-8')
+                        unchanged = (old_content == content)
+                    if unchanged:
                         logger.info('Repair unnecessary; content is unchanged',
                                     label_path)
+                        _count_label('unchanged')
                     else:
                         mode = 'save'       # re-save the file
                 else:
@@ -770,6 +1293,19 @@ class PdsTemplate:
                                 force=True)
                     mode = 'save'           # proceed with saving the file
 
+            # Sync case: save unless the manifest indicates that the file is unchanged
+            manifest = None
+            if mode == 'sync':
+                mode = 'save'
+                if label_path.is_local() and not fatals:
+                    manifest = _Manifest(label_path.get_local_path().parent)
+                    if not stream:
+                        hasher.update(content.encode('utf-8'))
+                    if manifest.unchanged(label_path.name, hasher.hexdigest()):
+                        logger.info('Label unchanged', label_path)
+                        _count_label('unchanged')
+                        return (errors, warns)
+
             # Otherwise, save
             if mode != 'save':
                 return (errors, warns)
@@ -777,6 +1313,7 @@ class PdsTemplate:
             # Don't save a file after a fatal error
             if fatals:
                 logger.error('File save aborted due to prior errors')
+                _count_label('not saved')
                 return (errors, warns)
 
             # Backup existing label if necessary
@@ -792,21 +1329,276 @@ class PdsTemplate:
                 exists = False
 
             # Write label
-            if content and not content.endswith(self.terminator):
-                content += self.terminator
-            label_path.write_bytes(content.encode('utf-8'))
+            if stream:
+                os.replace(temp_path, label_path.get_local_path())
+                temp_path = None
+                if not label_path.is_local():
+                    label_path.upload()
+            else:
+                label_path.write_bytes(content.encode('utf-8'))
+
+            if manifest:
+                manifest.record(label_path.name, hasher.hexdigest())
 
             # Log event
             if exists:
                 logger.info('Label re-written', label_path)
+                _count_label('rewritten')
             else:
                 logger.info('Label written', label_path)
+                _count_label('written')
 
         finally:
             logger.remove_handler(handler)      # OK if handler is None
+            if temp_path:
+                os.remove(temp_path)
 
         return (errors, warns)
 
+    def _write_temp_file(self, label_path, chunks, hasher=None):
+        """Write generated content into a new temporary file beside the label file.
+
+        Parameters:
+            label_path (FCPath): The output label file path.
+            chunks (iterator[str]): The generated content.
+            hasher (hashlib hash object, optional): Object to update with the bytes
+                written.
+
+        Returns:
+            str: The path to the temporary file.
+        """
+
+        local_path = label_path.get_local_path()
+        (fd, temp_path) = tempfile.mkstemp(dir=local_path.parent,
+                                           prefix=local_path.name + '.',
+                                           suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                last = ''
+                for chunk in chunks:
+                    if chunk:
+                        data = chunk.encode('utf-8')
+                        f.write(data)
+                        if hasher:
+                            hasher.update(data)
+                        last = chunk
+                if last and not last.endswith(self.terminator):
+                    data = self.terminator.encode('utf-8')
+                    f.write(data)
+                    if hasher:
+                        hasher.update(data)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        return temp_path
+
+    def write_many(self, items, *, jobs=None, mode='save', backup=False,
+                   raise_exceptions=False, handler=None, stream=False, quiet=False):
+        """Write many labels based on this template, using multiple processes.
+
+        Each worker process constructs its own copy of this template once, using the same
+        inputs as the original, and then writes its share of the labels. For this reason,
+        any preprocess and postprocess functions, their arguments, and every dictionary
+        must be picklable. Symbols defined via :meth:`define_global` are available in the
+        workers only if they are defined when a module is imported, or if the workers are
+        started by "fork".
+
+        Parameters:
+            items (iterable[tuple]):
+                Tuples (dictionary, label_path), one for each label to be written.
+            jobs (int, optional):
+                The number of worker processes. Default is the number of CPUs. Use 1 to
+                write every label in this process, without a process pool.
+            mode (str, optional):
+                "save", "repair", "validate", or "sync"; see :meth:`write`.
+            backup (bool, optional):
+                True to rename any existing label file; see :meth:`write`.
+            raise_exceptions (bool, optional):
+                True to raise any exceptions encountered; False to log them and embed the
+                error message into the label surrounded by "[[[" and "]]]".
+            handler (str, Path, FCPath, or logger.Handler, optional):
+                A handler to use exclusively during the generation of each label; see
+                :meth:`write`. A file extension such as ".log" is most useful here.
+            stream (bool, optional):
+                True to write each label to a file as it is generated; see :meth:`write`.
+            quiet (bool, optional):
+                True to log the labels as a single batch, with only warnings and errors
+                logged individually; see :func:`~utils.quiet_logging`.
+
+        Returns:
+            list[tuple]: One tuple (errors, warnings) for each label, in the same order as
+            `items`, each as returned by :meth:`write`.
+        """
+
+        if mode not in PdsTemplate._WRITE_MODES:
+            raise ValueError('invalid mode value: ' + repr(mode))
+
+        items = list(items)
+        options = dict(mode=mode, backup=backup, raise_exceptions=raise_exceptions,
+                       handler=handler, stream=stream)
+        jobs = jobs or os.cpu_count() or 1
+        jobs = min(jobs, len(items))
+        if not quiet:
+            return self._write_many(items, jobs, options)
+
+        with quiet_logging(f'Writing {len(items)} labels', self.template_path):
+            return self._write_many(items, jobs, options, quiet=True)
+
+    def _write_many(self, items, jobs, options, quiet=False):
+        """Internal version of write_many() after the options have been validated."""
+
+        if jobs <= 1:
+            return [self.write(dictionary, label_path, **options)
+                    for (dictionary, label_path) in items]
+
+        get_logger().info(f'Writing {len(items)} labels using {jobs} processes',
+                          self.template_path)
+        chunksize = max(1, min(64, len(items) // (4 * jobs)))
+        with concurrent.futures.ProcessPoolExecutor(
+                                    max_workers=jobs, initializer=_write_many_init,
+                                    initargs=(self._constructor_args, options, quiet)
+                                ) as executor:
+            results = list(executor.map(_write_many_job, items, chunksize=chunksize))
+
+        # In quiet mode, each worker also returns the outcome of its label. The errors and
+        # warnings were logged by the worker; count them in the batch without logging
+        # them again.
+        if quiet:
+            counter = _BATCH_COUNTER.get()
+            logger = get_logger()
+            for ((errors, warnings), outcomes) in results:
+                counter.update(outcomes)
+                for _ in range(errors):
+                    logger.error('Error in worker process', suppress=True)
+                for _ in range(warnings):
+                    logger.warning('Warning in worker process', suppress=True)
+            results = [result for (result, _) in results]
+
+        return results
+
+    async def agenerate(self, dictionary, label_path='', *, raise_exceptions=False,
+                        hide_warnings=False, abort_on_error=False):
+        """Coroutine version of :meth:`generate`, which runs in a separate thread.
+
+        Parameters:
+            dictionary (dict): The dictionary of parameters to replace in the template.
+            label_path (str, Path, or FCPath, optional): The output label file path, for
+                error messages.
+            raise_exceptions (bool, optional): True to raise any exceptions encountered.
+            hide_warnings (bool, optional): True to hide warning messages.
+            abort_on_error (bool, optional): True to abort the generation process if a
+                validation error is encountered; see :meth:`generate`.
+
+        Returns:
+            str: The generated content.
+        """
+
+        return await asyncio.to_thread(self.generate, dictionary, label_path,
+                                       raise_exceptions=raise_exceptions,
+                                       hide_warnings=hide_warnings,
+                                       abort_on_error=abort_on_error)
+
+    async def awrite(self, dictionary, label_path, *, mode='save', backup=False,
+                     raise_exceptions=False, handler=None, stream=False):
+        """Coroutine version of :meth:`write`, which runs in a separate thread.
+
+        Parameters:
+            dictionary (dict): The dictionary of parameters to replace in the template.
+            label_path (str, Path, or FCPath, optional): The output label file path.
+            mode (str, optional): "save", "repair", "validate", or "sync"; see
+                :meth:`write`.
+            backup (bool, optional): True to rename any existing label file; see
+                :meth:`write`.
+            raise_exceptions (bool, optional): True to raise any exceptions encountered.
+            handler (str, Path, FCPath, or logger.Handler, optional): A handler to use
+                exclusively during the generation of this label; see :meth:`write`.
+            stream (bool, optional): True to write the label to a file as it is
+                generated; see :meth:`write`.
+
+        Returns:
+            int: Number of errors issued.
+            int: Number of warnings issued.
+        """
+
+        return await asyncio.to_thread(self.write, dictionary, label_path, mode=mode,
+                                       backup=backup, raise_exceptions=raise_exceptions,
+                                       handler=handler, stream=stream)
+
+    async def awrite_many(self, items, *, jobs=8, mode='save', backup=False,
+                          raise_exceptions=False, handler=None, stream=False,
+                          quiet=False):
+        """Coroutine that writes many labels based on this template, several at a time.
+
+        Unlike :meth:`write_many`, which uses multiple processes, the labels are written
+        by threads of the event loop's default executor, so the time spent waiting to
+        read and write remote files overlaps.
+
+        Parameters:
+            items (iterable[tuple]):
+                Tuples (dictionary, label_path), one for each label to be written.
+            jobs (int, optional):
+                The maximum number of labels being written at the same time.
+            mode (str, optional):
+                "save", "repair", "validate", or "sync"; see :meth:`write`.
+            backup (bool, optional):
+                True to rename any existing label file; see :meth:`write`.
+            raise_exceptions (bool, optional):
+                True to raise any exceptions encountered; False to log them and embed the
+                error message into the label surrounded by "[[[" and "]]]".
+            handler (str, Path, FCPath, or logger.Handler, optional):
+                A handler to use exclusively during the generation of each label; see
+                :meth:`write`.
+            stream (bool, optional):
+                True to write each label to a file as it is generated; see :meth:`write`.
+            quiet (bool, optional):
+                True to log the labels as a single batch, with only warnings and errors
+                logged individually; see :func:`~utils.quiet_logging`.
+
+        Returns:
+            list[tuple]: One tuple (errors, warnings) for each label, in the same order as
+            `items`, each as returned by :meth:`write`.
+
+        Raises:
+            Exception: The first exception raised by :meth:`write`, if any, after the
+            labels already in progress are complete; no other labels are written.
+        """
+
+        if mode not in PdsTemplate._WRITE_MODES:
+            raise ValueError('invalid mode value: ' + repr(mode))
+
+        items = list(items)
+        options = dict(mode=mode, backup=backup, raise_exceptions=raise_exceptions,
+                       handler=handler, stream=stream)
+        results = [None] * len(items)
+        pending = iter(enumerate(items))
+        errors = []
+
+        # Each task writes the next pending label until none are left. After an exception,
+        # no new labels are started, and the exception is raised once the labels already
+        # in progress are complete.
+        async def write_pending():
+            for (k, (dictionary, label_path)) in pending:
+                if errors:
+                    return
+                try:
+                    results[k] = await asyncio.to_thread(self.write, dictionary,
+                                                         label_path, **options)
+                except Exception as err:
+                    errors.append(err)
+
+        tasks = max(1, min(jobs, len(items)))
+        if quiet:
+            with quiet_logging(f'Writing {len(items)} labels', self.template_path):
+                await asyncio.gather(*[write_pending() for _ in range(tasks)])
+        else:
+            await asyncio.gather(*[write_pending() for _ in range(tasks)])
+
+        if errors:
+            raise errors[0]
+
+        return results
+
     @staticmethod
     def log(level, message, filepath='', *, force=False):
         """Send a message to the current logger.
@@ -837,10 +1629,91 @@ class PdsTemplate:
 
         # Add the new value to the permanent set (even if it's not really a function)
         PdsTemplate._PREDEFINED_FUNCTIONS[name] = value
+        PdsTemplate._PREDEFINED_BUILTINS[name] = value
+
+        # Templates whose constant expressions used the old value must re-evaluate them
+        PdsTemplate._GLOBALS_VERSION += 1
+        PdsTemplate._REDEFINED_GLOBALS[name] = PdsTemplate._GLOBALS_VERSION
 
         # If generate() is currently active, add it to the active dictionary too
-        if PdsTemplate._CURRENT_LABEL_PATH:     # hard to get here  # pragma: no cover
-            PdsTemplate._CURRENT_GLOBAL_DICT[name] = value
+        global_dict = PdsTemplate._CURRENT_GLOBAL_DICT.get()
+        if global_dict is not None:
+            global_dict[name] = value
+
+    @staticmethod
+    def get(template, content='', **options):
+        """A PdsTemplate from the process-wide registry, constructed only if necessary.
+
+        A template is re-used if its path and constructor options match and, if it was
+        read from a file, the file's modification time and size are unchanged; if
+        `content` is given, the content must be the same instead. The least recently used
+        template is discarded when the registry is full; see set_registry_size().
+
+        The returned object is shared. Its `fatal_count`, `error_count`, and
+        `warning_count` attributes describe only the most recent label generated by any
+        caller, so use the counts returned by :meth:`write` instead. Likewise, its
+        `profile` setting and statistics are shared. Files included via $INCLUDE are not
+        checked for changes.
+
+        Parameters:
+            template (str, Path, or FCPath): Path of the input template file.
+            content (str or list[str], optional): Alternative source of the template
+                content rather than reading it from a file.
+            **options: Any other inputs to the PdsTemplate constructor.
+
+        Returns:
+            PdsTemplate: The template.
+        """
+
+        filepath = FCPath(template)
+        if content:
+            text = content if isinstance(content, str) else '\n'.join(content)
+            stamp = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        else:
+            try:
+                stamp = _file_stamp(filepath)
+            except FileNotFoundError:   # let the constructor report the error
+                stamp = None
+
+        # Without a modification time, there is no way to know if the file has changed
+        if stamp is None:
+            return PdsTemplate(template, content, **options)
+
+        key = (str(filepath), stamp, repr(sorted(options.items())))
+        with PdsTemplate._REGISTRY_LOCK:
+            cached = PdsTemplate._REGISTRY.get(key)
+            if cached is not None:
+                PdsTemplate._REGISTRY.move_to_end(key)
+                return cached
+
+        # Construct outside the lock, so other templates remain available meanwhile
+        result = PdsTemplate(template, content, **options)
+        with PdsTemplate._REGISTRY_LOCK:
+            PdsTemplate._REGISTRY[key] = result
+            PdsTemplate._trim_registry()
+
+        return result
+
+    @staticmethod
+    def set_registry_size(size):
+        """Set the maximum number of templates retained by PdsTemplate.get().
+
+        Parameters:
+            size (int): The maximum number of templates; use zero to disable the
+                registry.
+        """
+
+        with PdsTemplate._REGISTRY_LOCK:
+            PdsTemplate._REGISTRY_SIZE = max(0, int(size))
+            PdsTemplate._trim_registry()
+
+    @staticmethod
+    def _trim_registry():
+        """Discard the least recently used templates until the registry is within its size
+        limit. The caller must hold the registry lock."""
+
+        while len(PdsTemplate._REGISTRY) > PdsTemplate._REGISTRY_SIZE:
+            PdsTemplate._REGISTRY.popitem(last=False)
 
     ######################################################################################
     # Utility functions
@@ -876,6 +1749,7 @@ class PdsTemplate:
         return (true if value else false)
 
     _counters = {}
+    _counters_lock = threading.Lock()
 
     @staticmethod
     def COUNTER(name, reset=False):
@@ -892,12 +1766,13 @@ class PdsTemplate:
             int: The value of the counter.
         """
 
-        if name not in PdsTemplate._counters.keys():
-            PdsTemplate._counters[name] = 0
-        PdsTemplate._counters[name] += 1
-        if reset:
-            PdsTemplate._counters[name] = 0
-        return PdsTemplate._counters[name]
+        with PdsTemplate._counters_lock:
+            if name not in PdsTemplate._counters.keys():
+                PdsTemplate._counters[name] = 0
+            PdsTemplate._counters[name] += 1
+            if reset:
+                PdsTemplate._counters[name] = 0
+            return PdsTemplate._counters[name]
 
     @staticmethod
     def CURRENT_TIME(date_only=False):
@@ -1170,7 +2045,7 @@ class PdsTemplate:
             str: Path string to the label file.
         """
 
-        return str(PdsTemplate._CURRENT_LABEL_PATH)
+        return str(PdsTemplate._CURRENT_LABEL_PATH.get())
 
     @staticmethod
     def LOG(level, message, filepath='', *, force=False):
@@ -1312,7 +2187,7 @@ class PdsTemplate:
             str: Path string to this template file.
         """
 
-        return str(PdsTemplate._CURRENT_TEMPLATE.template_path)
+        return str(PdsTemplate._CURRENT_TEMPLATE.get().template_path)
 
     @staticmethod
     def VERSION_ID():
@@ -1410,6 +2285,52 @@ PdsTemplate._PREDEFINED_FUNCTIONS['TEMPLATE_PATH'] = PdsTemplate.TEMPLATE_PATH
 PdsTemplate._PREDEFINED_FUNCTIONS['VERSION_ID'   ] = PdsTemplate.VERSION_ID
 PdsTemplate._PREDEFINED_FUNCTIONS['WRAP'         ] = PdsTemplate.WRAP
 
+# The predefined functions are shared by every label via the "__builtins__" of the global
+# dictionary, so they need not be copied into the dictionary for each label.
+PdsTemplate._PREDEFINED_BUILTINS = dict(builtins.__dict__)
+PdsTemplate._PREDEFINED_BUILTINS.update(PdsTemplate._PREDEFINED_FUNCTIONS)
+
+##########################################################################################
+# Worker process support for write_many()
+##########################################################################################
+
+_WORKER_TEMPLATE = None
+_WORKER_OPTIONS = {}
+_WORKER_QUIET = False
+
+
+def _write_many_init(constructor_args, options, quiet=False):
+    """Initializer for each worker process of write_many()."""
+
+    global _WORKER_TEMPLATE, _WORKER_OPTIONS, _WORKER_QUIET
+
+    # In quiet mode, only warnings and errors are logged by the worker
+    if quiet:
+        logger = get_logger()
+        logger.set_level(max(logger.level, logging.WARNING))
+
+    (template, content, kwargs) = constructor_args
+    _WORKER_TEMPLATE = PdsTemplate(template, content, **kwargs)
+    _WORKER_OPTIONS = options
+    _WORKER_QUIET = quiet
+
+
+def _write_many_job(item):
+    """Write one label within a worker process of write_many().
+
+    In quiet mode, the return value is a tuple containing the value returned by write()
+    and a Counter of the label's outcome.
+    """
+
+    (dictionary, label_path) = item
+    if not _WORKER_QUIET:
+        return _WORKER_TEMPLATE.write(dictionary, label_path, **_WORKER_OPTIONS)
+
+    counter = collections.Counter()
+    _BATCH_COUNTER.set(counter)
+    result = _WORKER_TEMPLATE.write(dictionary, label_path, **_WORKER_OPTIONS)
+    return (result, counter)
+
 ##########################################################################################
 # LabelStatus class
 ##########################################################################################
@@ -1435,16 +2356,28 @@ class _LabelState(object):
 
         self.template = template
         self.label_path = label_path
-        self.terminator = terminator
+        self.terminator = terminator or template.terminator
         self.raise_exceptions = raise_exceptions
 
+        # Each $FOR and $IF block pushes a new local dictionary, which is popped by the
+        # matching $END_FOR or $END_IF
         self.local_dicts = [{}]
 
-        # Merge the predefined functions into a copy of the global dictionary
+        # True to ignore the compile-time evaluation of constant expressions
+        self.unfold = False
+
+        # If the template is being profiled, the statistics for this label
+        self.profile = None
+
+        # Every string of label content is passed to out()
+        self.parts = []
+        self.out = self.parts.append
+
+        # The global scope is a copy of the dictionary, which can be modified during
+        # generation via define_global(). Names not found there are looked up in the
+        # predefined functions and then in Python's builtins.
         self.global_dict = dictionary.copy()
-        for key, func in PdsTemplate._PREDEFINED_FUNCTIONS.items():
-            if key not in self.global_dict:
-                self.global_dict[key] = func
+        self.global_dict['__builtins__'] = PdsTemplate._PREDEFINED_BUILTINS
 
     def define_global(self, name, value):
         """Add this definition to this state's global dictionary."""
@@ -1459,5 +2392,6 @@ PdsTemplate.set_logger = set_logger
 PdsTemplate.get_logger = get_logger
 PdsTemplate.set_log_level = set_log_level
 PdsTemplate.set_log_format = set_log_format
+PdsTemplate.quiet_logging = quiet_logging
 
 ##########################################################################################
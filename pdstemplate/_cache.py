@@ -0,0 +1,207 @@
+##########################################################################################
+# pdstemplate/_cache.py
+##########################################################################################
+"""On-disk caches of compiled templates and generated label content."""
+
+import copyreg
+import hashlib
+import io
+import marshal
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+import types
+
+from .utils import get_logger
+
+
+def _reduce_code(code):
+    """Pickle reducer for code objects, which the pickle module cannot handle directly."""
+
+    return (marshal.loads, (marshal.dumps(code),))
+
+
+class _BlockPickler(pickle.Pickler):
+    """Pickler for a deque of _PdsBlocks.
+
+    Code objects are saved via marshal. The PdsTemplate object referenced by every block
+    is not saved; it is replaced by the template being constructed when the cache file is
+    loaded.
+    """
+
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table[types.CodeType] = _reduce_code
+
+    def __init__(self, file, template):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.template = template
+
+    def persistent_id(self, obj):
+        return 'template' if obj is self.template else None
+
+
+class _BlockUnpickler(pickle.Unpickler):
+    """Unpickler for a deque of _PdsBlocks saved by _BlockPickler."""
+
+    def __init__(self, file, template):
+        super().__init__(file)
+        self.template = template
+
+    def persistent_load(self, pid):
+        if pid == 'template':
+            return self.template
+        raise pickle.UnpicklingError('unsupported persistent id: ' + repr(pid))
+
+
+def _cache_dir(cache_dir):
+    """The cache directory as a pathlib.Path, or None if caching is disabled.
+
+    If `cache_dir` is None, the environment variable "PDSTEMPLATE_CACHE" is used instead.
+    An empty string disables caching.
+    """
+
+    if cache_dir is None:
+        cache_dir = os.getenv('PDSTEMPLATE_CACHE', '')
+
+    return pathlib.Path(cache_dir) if cache_dir else None
+
+
+def _cache_key(template, content, version):
+    """The key identifying the compiled form of a template.
+
+    Parameters:
+        template (PdsTemplate): The template being constructed.
+        content (str): The content of the template after all pre-processing, including
+            the content of every $INCLUDE file with an explicit name.
+        version (str): The version of the pdstemplate module.
+
+    Returns:
+        str: A hexadecimal SHA-256 digest.
+    """
+
+    # The Python version matters because code objects are saved via marshal. The template
+    # path matters because it appears in error messages. The line terminator matters
+    # because it is built into the literal text.
+    hasher = hashlib.sha256()
+    for part in (version, sys.implementation.cache_tag, str(template.template_path),
+                 repr(template.xml), repr(template.terminator), content):
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+
+    return hasher.hexdigest()
+
+
+def _load_blocks(cache_dir, key, template):
+    """The deque of _PdsBlocks for a template from the cache, or None if not found.
+
+    Parameters:
+        cache_dir (pathlib.Path): The cache directory.
+        key (str): The key returned by _cache_key().
+        template (PdsTemplate): The template being constructed.
+
+    Returns:
+        deque[_PdsBlock] or None: The compiled blocks; None if they are not available.
+    """
+
+    path = cache_dir / (key + '.pickle')
+    try:
+        with path.open('rb') as f:
+            blocks = _BlockUnpickler(f, template).load()
+    except FileNotFoundError:
+        return None
+    except Exception as err:    # an unreadable cache file is not an error; just rebuild
+        get_logger().debug(f'Cache file not loaded: {err!r}', path)
+        return None
+
+    get_logger().debug('Compiled template loaded from cache', path)
+    return blocks
+
+
+def _save_blocks(cache_dir, key, template, blocks):
+    """Save the deque of _PdsBlocks for a template into the cache.
+
+    The file is written under a temporary name and then renamed, so concurrent processes
+    never see a partial file. Any failure is logged as a warning and otherwise ignored.
+
+    Parameters:
+        cache_dir (pathlib.Path): The cache directory.
+        key (str): The key returned by _cache_key().
+        template (PdsTemplate): The template being constructed.
+        blocks (deque[_PdsBlock]): The compiled blocks.
+    """
+
+    path = cache_dir / (key + '.pickle')
+    try:
+        buffer = io.BytesIO()
+        _BlockPickler(buffer, template).dump(blocks)
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        (fd, temp_path) = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer.getvalue())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    except Exception as err:
+        get_logger().warning(f'Compiled template not cached: {err!r}', path)
+        return
+
+    get_logger().debug('Compiled template saved to cache', path)
+
+
+def _render_path(cache_dir, key):
+    """The path to the cached label content for a key."""
+
+    return cache_dir / key[:2] / (key + '.txt')
+
+
+def _load_render(cache_dir, key):
+    """Cached label content, or None if not found.
+
+    Parameters:
+        cache_dir (pathlib.Path): The render cache directory.
+        key (str): The key identifying the label content.
+
+    Returns:
+        str or None: The label content; None if it is not available.
+    """
+
+    try:
+        return _render_path(cache_dir, key).read_bytes().decode('utf-8')
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _save_render(cache_dir, key, content):
+    """Save label content into the render cache.
+
+    As in _save_blocks(), the file is written under a temporary name and then renamed, and
+    any failure is logged as a warning and otherwise ignored.
+
+    Parameters:
+        cache_dir (pathlib.Path): The render cache directory.
+        key (str): The key identifying the label content.
+        content (str): The label content.
+    """
+
+    path = _render_path(cache_dir, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        (fd, temp_path) = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content.encode('utf-8'))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    except Exception as err:
+        get_logger().warning(f'Label content not cached: {err!r}', path)
+
+##########################################################################################
@@ -0,0 +1,267 @@
+##########################################################################################
+# pdstemplate/_codegen.py
+##########################################################################################
+"""Translation of a compiled template into a single generated Python function."""
+
+from ._pdsblock import (_PdsBlock, _PdsOnceBlock, _PdsNoteBlock, _PdsForBlock,
+                        _PdsIfBlock, _PdsIncludeBlock)
+from .utils import get_logger
+
+
+class _CodeGenerator(object):
+    """Translator from a deque of _PdsBlock objects into the source code of one Python
+    function.
+
+    The generated function has the call signature::
+
+        _render(state) -> iterator[None]
+
+    where `state` is the _LabelState describing the label being generated. Like
+    _PdsBlock.execute(), the function passes every string to the state's output function
+    and is a generator that yields None after each iteration of a $FOR loop. $FOR blocks
+    become native "for" loops, $IF/$ELSE_IF/$ELSE blocks become "if/elif/else" statements,
+    and literal text becomes constant strings passed to the output. Expressions are
+    evaluated from the same code objects used by the _PdsBlocks, and any exception is
+    passed to _PdsBlock.expression_error(), so error handling is identical to that of the
+    interpreter. Dynamic $INCLUDE blocks are delegated to the interpreter.
+
+    Parameters:
+        template (PdsTemplate): The template being translated.
+    """
+
+    INDENT = '    '
+
+    def __init__(self, template):
+
+        self.template = template
+        self.lines = []
+        self.namespace = {
+            '_is_error': _PdsBlock._is_error,
+            '_format': _PdsBlock.format_value,
+            '_terminate': _PdsBlock._terminate,
+            '_sized': _PdsForBlock._sized,
+            '_XML': template.xml,
+            '_UPPER_E': template.upper_e,
+            '_TERMINATOR': template.terminator,
+        }
+        self._constants = {}            # id(object) -> name in namespace
+        self._depth = 0                 # depth of nested $FOR loops
+
+    def _constant(self, obj, prefix):
+        """Name of a global variable in the generated code that refers to `obj`."""
+
+        key = id(obj)
+        if key not in self._constants:
+            name = f'_{prefix}{len(self._constants)}'
+            self._constants[key] = name
+            self.namespace[name] = obj
+
+        return self._constants[key]
+
+    def _emit(self, indent, line):
+        """Append one line of source code."""
+
+        self.lines.append(self.INDENT * indent + line)
+
+    ######################################################################################
+    # Translation
+    ######################################################################################
+
+    def translate(self, blocks):
+        """Translate a deque of _PdsBlocks into the source code of function "_render".
+
+        Parameters:
+            blocks (deque[_PdsBlock]): The blocks to translate.
+
+        Returns:
+            str: The source code.
+        """
+
+        self._emit(0, 'def _render(state):')
+        self._emit(1, 'out = state.out')
+        self._emit(1, 'G = state.global_dict')
+        self._emit(1, 'L = state.local_dicts[-1]')
+        self._blocks(blocks, 1)
+        self._emit(1, 'yield from ()')         # a generator, even if nothing is yielded
+        return '\n'.join(self.lines) + '\n'
+
+    def _blocks(self, blocks, indent):
+        """Append the source code for a sequence of blocks."""
+
+        for block in blocks:
+            if isinstance(block, _PdsNoteBlock):
+                continue
+            elif isinstance(block, _PdsOnceBlock):
+                self._once(block, indent)
+            elif isinstance(block, _PdsForBlock):
+                self._for(block, indent)
+            elif isinstance(block, _PdsIfBlock):
+                self._if(block, indent)
+            elif isinstance(block, _PdsIncludeBlock):
+                self._include(block, indent)
+            else:                       # pragma: no cover - can't get here
+                raise TypeError('unrecognized block type ' + type(block).__name__)
+
+    def _evaluate(self, block, expression, code, line, target, indent, column=None):
+        """Append the source code to evaluate one expression into variable `target`."""
+
+        name = self._constant(block, 'b')
+        source = self._constant(expression if code is None else code, 'c')
+        self._emit(indent, 'try:')
+        self._emit(indent+1, f'{target} = eval({source}, G, L)')
+        self._emit(indent, 'except Exception as err:')
+        self._emit(indent+1, f'{target} = {name}.expression_error(err, {expression!r}, '
+                             f'{line}, state, {column})')
+
+    def _body(self, block, indent):
+        """Append the source code for the body of one block and its sub-blocks."""
+
+        literal = ''
+        for k, item in enumerate(block.preprocessed):
+
+            # Literal text, including "$$", is merged with any adjacent literal text
+            if k % 2 == 0:
+                literal += item
+                continue
+
+            (expression, name, line, code, column) = item
+            if not expression:
+                literal += '$'
+                continue
+
+            if literal:
+                self._emit(indent, f'out({literal!r})')
+                literal = ''
+
+            self._evaluate(block, expression, code, line, 'v', indent, column)
+            if name:
+                self._emit(indent, 'if not _is_error(v):')
+                self._emit(indent+1, f'L[{name!r}] = v')
+            self._emit(indent, 'out(_format(v, _XML, _UPPER_E, _TERMINATOR))')
+
+        if literal:
+            self._emit(indent, f'out({literal!r})')
+
+        self._blocks(block.sub_blocks, indent)
+
+    def _once(self, block, indent):
+        """Append the source code for a _PdsOnceBlock."""
+
+        if block.pop_local_dict:
+            self._emit(indent, 'state.local_dicts.pop()')
+            self._emit(indent, 'L = state.local_dicts[-1]')
+
+        if not block.arg:
+            self._body(block, indent)
+            return
+
+        self._evaluate(block, block.arg, block.code, block.line, 'v', indent)
+        self._emit(indent, 'if _is_error(v):')
+        self._emit(indent+1, 'out(_terminate(v, _TERMINATOR))')
+        self._emit(indent, 'else:')
+        if block.name:
+            self._emit(indent+1, f'L[{block.name!r}] = v')
+        self._emit(indent+1, 'pass')
+        self._body(block, indent+1)
+
+    def _for(self, block, indent):
+        """Append the source code for a _PdsForBlock."""
+
+        self._depth += 1
+        items = f'items{self._depth}'
+        k = f'k{self._depth}'
+        item = f'item{self._depth}'
+
+        self._evaluate(block, block.arg, block.code, block.line, items, indent)
+        # A copy, not a ChainMap: frames hold only loop variables and lookups were slower
+        self._emit(indent, 'state.local_dicts.append(L.copy())')
+        self._emit(indent, 'L = state.local_dicts[-1]')
+        self._emit(indent, f'if _is_error({items}):')
+        self._emit(indent+1, f'out(_terminate({items}, _TERMINATOR))')
+        self._emit(indent, 'else:')
+        if block.uses_length:
+            self._emit(indent+1, f'({items}, L[{block.length!r}]) = _sized({items})')
+        self._emit(indent+1, f'for {k}, {item} in enumerate({items}):')
+        self._emit(indent+2, 'L = state.local_dicts[-1]')
+        self._emit(indent+2, f'L[{block.value!r}] = {item}')
+        self._emit(indent+2, f'L[{block.index!r}] = {k}')
+        self._body(block, indent+2)
+        self._emit(indent+2, 'yield')
+
+        self._depth -= 1
+
+    def _if(self, block, indent):
+        """Append the source code for a _PdsIfBlock and its $ELSE_IF and $ELSE blocks.
+
+        The chain of $ELSE_IF blocks is written as a flat "elif" sequence, so long chains
+        do not increase the indentation of the generated code.
+        """
+
+        self._evaluate(block, block.arg, block.code, block.line, 's', indent)
+        # A copy, not a ChainMap: frames are small and ChainMap lookups were slower
+        self._emit(indent, 'state.local_dicts.append(L.copy())')
+        self._emit(indent, 'L = state.local_dicts[-1]')
+        self._emit(indent, 'if _is_error(s):')
+        self._emit(indent+1, 'out(_terminate(s, _TERMINATOR))')
+        self._emit(indent, 'else:')
+        if block.name:
+            self._emit(indent+1, f'L[{block.name!r}] = s')
+        self._emit(indent+1, 'if s:')
+        self._emit(indent+2, 'pass')
+        self._body(block, indent+2)
+
+        while block.else_if_block:
+            block = block.else_if_block
+            name = self._constant(block, 'b')
+            self._emit(indent+1, f'elif _is_error(s := {name}.evaluate_expression('
+                                 f'{name}.arg, {name}.line, state, {name}.code)):')
+            self._emit(indent+2, 'out(_terminate(s, _TERMINATOR))')
+            if block.name:
+                self._emit(indent+1, f'elif L.__setitem__({block.name!r}, s) or s:')
+            else:
+                self._emit(indent+1, 'elif s:')
+            self._emit(indent+2, 'pass')
+            self._body(block, indent+2)
+
+        if block.else_block:
+            self._emit(indent+1, 'else:')
+            self._emit(indent+2, 'pass')
+            self._body(block.else_block, indent+2)
+
+    def _include(self, block, indent):
+        """Append the source code for a _PdsIncludeBlock, which is interpreted."""
+
+        name = self._constant(block, 'b')
+        self._emit(indent, f'yield from {name}.execute(state)')
+        self._emit(indent, 'L = state.local_dicts[-1]')
+
+
+def _generate_renderer(template, blocks):
+    """Generate a Python function that renders the given blocks.
+
+    Parameters:
+        template (PdsTemplate): The template being compiled.
+        blocks (deque[_PdsBlock]): The blocks of the template.
+
+    Returns:
+        function or None: A generator function with call signature `_render(state)`; None
+        if the generated source could not be compiled, in which case the interpreter must
+        be used instead.
+        str: The generated source code.
+    """
+
+    generator = _CodeGenerator(template)
+    source = generator.translate(blocks)
+    try:
+        code = compile(source, f'<pdstemplate {template.template_path.name}>', 'exec',
+                       dont_inherit=True)
+    except (SyntaxError, RecursionError, MemoryError) as err:
+        get_logger().warning('Code generation failed; template will be interpreted: '
+                             + str(err), template.template_path)
+        return (None, source)
+
+    namespace = generator.namespace
+    exec(code, namespace)
+    return (namespace['_render'], source)
+
+##########################################################################################
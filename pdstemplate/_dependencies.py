@@ -0,0 +1,107 @@
+##########################################################################################
+# pdstemplate/_dependencies.py
+##########################################################################################
+"""Analysis of the names on which the content of a template depends."""
+
+import ast
+
+from ._folding import _PURE_FUNCTIONS
+from ._pdsblock import _PdsForBlock, _PdsIncludeBlock, _all_blocks
+
+# Names that do not need to be found in the dictionary for the generated content to be
+# determined by the dictionary, the label path, and the template.
+_STATIC_NAMES = _PURE_FUNCTIONS | {
+    # More Python builtins
+    'all', 'any', 'dict', 'divmod', 'enumerate', 'filter', 'isinstance', 'list', 'map',
+    'pow', 'range', 'reversed', 'set', 'sorted', 'tuple', 'zip',
+    # More predefined functions, which depend only on the label and template paths
+    'LABEL_PATH', 'TEMPLATE_PATH',
+    # Defined by generate()
+    'hide_warnings', 'abort_on_error',
+}
+
+
+def _static_identity(value):
+    """A description of the current value of a static name, to include in the key of a
+    label in the render cache, so that labels generated before the name was redefined by
+    define_global() are not re-used. It is the same in every process.
+    """
+
+    code = getattr(value, '__code__', None)
+    return (getattr(value, '__module__', None), getattr(value, '__qualname__', None),
+            None if code is None else code.co_code)
+
+
+def _expression_names(expression):
+    """The names loaded and assigned by an expression.
+
+    Returns:
+        set[str]: The names loaded.
+        set[str]: The names assigned, including comprehension variables and lambda
+        arguments.
+
+    Raises:
+        SyntaxError: If the expression is invalid.
+    """
+
+    loaded = set()
+    assigned = set()
+    for node in ast.walk(ast.parse(expression.lstrip(' \t'), mode='eval')):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                loaded.add(node.id)
+            else:
+                assigned.add(node.id)
+        elif isinstance(node, ast.arg):
+            assigned.add(node.arg)
+
+    return (loaded, assigned)
+
+
+def _template_dependencies(blocks, includes=False):
+    """The names on which the content generated from the given blocks depends.
+
+    Parameters:
+        blocks (deque[_PdsBlock]): The blocks of a template.
+        includes (bool, optional): True to ignore the unknown content of any $INCLUDE
+            file; False to return None if the template contains an $INCLUDE.
+
+    Returns:
+        tuple or None: A tuple (loaded, assigned), where `loaded` is the set of names the
+        expressions refer to and `assigned` is the set of local names the template
+        defines. None if the dependencies cannot be determined, because the template
+        contains an $INCLUDE or an invalid expression.
+    """
+
+    loaded = set()
+    assigned = set()
+    for block in _all_blocks(blocks, notes=False):
+        if isinstance(block, _PdsIncludeBlock) and not includes:
+            return None
+        if isinstance(block, _PdsForBlock):
+            assigned |= {block.value, block.index, block.length}
+        elif getattr(block, 'name', ''):
+            assigned.add(block.name)
+
+        # Use the original expressions, including any evaluated at compile time
+        preprocessed = block.preprocessed if block.unfolded is None else block.unfolded
+        expressions = [getattr(block, 'arg', '')]
+        for k, item in enumerate(preprocessed):
+            if k % 2 == 1:
+                expressions.append(item[0])
+                assigned.add(item[1])
+
+        for expression in expressions:
+            if not expression:
+                continue
+            try:
+                names = _expression_names(expression)
+            except SyntaxError:
+                return None
+            loaded |= names[0]
+            assigned |= names[1]
+
+    assigned.discard('')
+    return (loaded, assigned)
+
+##########################################################################################
@@ -0,0 +1,137 @@
+##########################################################################################
+# pdstemplate/_folding.py
+##########################################################################################
+"""Compile-time evaluation of constant expressions in a template."""
+
+import dis
+from collections import deque
+
+from ._pdsblock import _PdsBlock, _PdsForBlock, _PdsIncludeBlock, _all_blocks
+
+# Functions whose result depends only on their arguments. An expression that refers to no
+# other names is evaluated once, when the template is compiled.
+_PURE_FUNCTIONS = {
+    # Python builtins
+    'abs', 'bool', 'chr', 'float', 'format', 'hex', 'int', 'len', 'max', 'min', 'oct',
+    'ord', 'repr', 'round', 'str', 'sum',
+    # Predefined functions
+    'BASENAME', 'BOOL', 'NOESCAPE', 'QUOTE_IF', 'REPLACE_NA', 'REPLACE_UNK', 'VERSION_ID',
+    'WRAP',
+}
+
+
+def _scan_code(code):
+    """The names loaded and stored by a code object.
+
+    Returns:
+        set[str] or None: The names loaded; None if the code contains nested code, such as
+        a lambda or comprehension.
+        set[str]: The names stored, e.g., by the walrus operator.
+    """
+
+    if any(isinstance(const, type(code)) for const in code.co_consts):
+        return (None, set(code.co_names))
+
+    loaded = set()
+    stored = set()
+    for instruction in dis.get_instructions(code):
+        if instruction.opname in ('LOAD_NAME', 'LOAD_GLOBAL'):
+            loaded.add(instruction.argval)
+        elif instruction.opname in ('STORE_NAME', 'DELETE_NAME', 'STORE_GLOBAL',
+                                    'DELETE_GLOBAL'):
+            stored.add(instruction.argval)
+
+    return (loaded, stored)
+
+
+def _assigned_names(blocks):
+    """The set of local names that might be assigned while the blocks are executed; None
+    if any name might be assigned, because of an $INCLUDE."""
+
+    names = set()
+    for block in _all_blocks(blocks):
+        if isinstance(block, _PdsIncludeBlock):
+            return None
+        if isinstance(block, _PdsForBlock):
+            names |= {block.value, block.index, block.length}
+        elif getattr(block, 'name', ''):
+            names.add(block.name)
+
+        codes = [item[3] for k, item in enumerate(block.preprocessed) if k % 2 == 1]
+        codes.append(getattr(block, 'code', None))
+        for code in codes:
+            if code is not None:
+                names |= _scan_code(code)[1]
+
+        names |= {item[1] for k, item in enumerate(block.preprocessed) if k % 2 == 1}
+
+    return names
+
+
+def _fold_constants(template, blocks):
+    """Evaluate the constant expressions in the bodies of the given blocks and merge the
+    results with the adjacent literal text.
+
+    An expression is constant if it has no side effects and it refers only to pure
+    functions. The dictionary passed to generate() can still override those functions,
+    so each block that relied on one retains its original content in its "unfolded"
+    attribute.
+
+    Parameters:
+        template (PdsTemplate): The template being compiled.
+        blocks (deque[_PdsBlock]): The blocks of the template.
+
+    Returns:
+        set[str]: The names of the functions on which the folded expressions depend.
+    """
+
+    # Names assigned inside the template can override the pure functions too
+    assigned = _assigned_names(blocks)
+    pure = set() if assigned is None else _PURE_FUNCTIONS - assigned
+
+    global_dict = {'__builtins__': type(template)._PREDEFINED_BUILTINS}
+    folded_names = set()
+    for block in _all_blocks(blocks):
+        literal = ''
+        parts = []
+        depends = set()
+        for k, item in enumerate(block.preprocessed):
+
+            # Literal text
+            if k % 2 == 0:
+                literal += item
+                continue
+
+            # "$$" becomes a literal dollar sign
+            (expression, name, line, code, column) = item
+            if not expression:
+                literal += '$'
+                continue
+
+            if not name and code is not None:
+                (loaded, stored) = _scan_code(code)
+                if loaded is not None and not stored and loaded <= pure:
+                    try:
+                        value = eval(code, global_dict, {})
+                    except Exception:   # leave the error for label generation to report
+                        pass
+                    else:
+                        literal += _PdsBlock.format_value(value, template.xml,
+                                                          template.upper_e,
+                                                          template.terminator)
+                        depends |= loaded
+                        continue
+
+            parts += [literal, item]
+            literal = ''
+
+        parts.append(literal)
+        if len(parts) < len(block.preprocessed):
+            if depends:
+                block.unfolded = block.preprocessed
+                folded_names |= depends
+            block.preprocessed = deque(parts)
+
+    return folded_names
+
+##########################################################################################
@@ -0,0 +1,136 @@
+##########################################################################################
+# pdstemplate/_includes.py
+##########################################################################################
+"""Location of include files."""
+
+import os
+import stat
+
+from filecache import FCPath
+
+
+class _IncludeResolver(object):
+    """Class that locates the files named in $INCLUDE headers.
+
+    A name is first tried as a path by itself and then relative to each include directory
+    in turn. The resolver remembers the path at which each name was found and also every
+    location where a name was found to be missing, so each location is checked at most
+    once. Optionally, the content of each include directory is listed once, the first time
+    it is needed, after which simple file names are located without any further I/O.
+
+    Parameters:
+        include_dirs (list[FCPath]): Ordered list of directories in which to look for
+            named files.
+        listing (bool, optional): True to list the content of each include directory
+            rather than to check for each file individually.
+    """
+
+    def __init__(self, include_dirs, listing=False):
+
+        self.include_dirs = list(include_dirs)
+        self.listing = listing
+        self._found = {}        # name -> FCPath
+        self._missing = set()   # (name, index of directory or -1)
+        self._listings = {}     # index of directory -> set of names or None
+
+    def resolve(self, filename):
+        """The path to the named file.
+
+        Parameters:
+            filename (str, Path, or FCPath): The name or path to the file.
+
+        Returns:
+            FCPath: The path to the file.
+
+        Raises:
+            FileNotFoundError: If the file is not found.
+        """
+
+        name = str(filename)
+        filepath = self._found.get(name)
+        if filepath is not None:
+            return filepath
+
+        candidates = [(-1, FCPath(filename))]
+        candidates += [(k, dir / filename) for k, dir in enumerate(self.include_dirs)]
+        for (k, filepath) in candidates:
+            if (name, k) in self._missing:
+                continue
+            if self._exists(k, name, filepath):
+                self._found[name] = filepath
+                return filepath
+            self._missing.add((name, k))
+
+        # On failure, raise the same exception as an attempt to read the file directly
+        FCPath(filename).read_text()
+        raise FileNotFoundError(f'No such file: {name!r}')          # pragma: no cover
+
+    def forget(self, filename):
+        """Discard everything known about the location of the named file."""
+
+        name = str(filename)
+        self._found.pop(name, None)
+        self._missing = {key for key in self._missing if key[0] != name}
+
+    def read_text(self, filename):
+        """The content of the named file.
+
+        Parameters:
+            filename (str, Path, or FCPath): The name or path to the file.
+
+        Returns:
+            str: The content of the file as a single string containing "\n" line
+                terminators.
+
+        Raises:
+            FileNotFoundError: If the file is not found.
+            OSError: Any subclass of OSError explaining why the file could not be read.
+        """
+
+        return self.resolve(filename).read_text()   # convert <CR><LF> to <LF>
+
+    def _exists(self, k, name, filepath):
+        """True if the file exists; k is the index of the include directory or -1."""
+
+        if k >= 0 and self.listing and not any(c in name for c in '/\\'):
+            names = self._listing(k)
+            if names is not None:
+                return name in names
+
+        try:
+            if filepath.is_local():
+                return os.path.isfile(filepath.get_local_path())
+            return filepath.exists()
+        except (NotImplementedError, OSError):
+            return False
+
+    def _listing(self, k):
+        """The set of names in include directory k; None if it cannot be listed."""
+
+        if k not in self._listings:
+            try:
+                names = {path.name for path in self.include_dirs[k].iterdir()}
+            except (NotImplementedError, OSError):
+                names = None
+            self._listings[k] = names
+
+        return self._listings[k]
+
+
+def _file_stamp(filepath):
+    """The modification time and size of a file; None if unavailable.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+
+    if filepath.is_local():
+        info = os.stat(filepath.get_local_path())
+        if not stat.S_ISREG(info.st_mode):
+            raise FileNotFoundError(f'Not a file: {filepath}')
+        return (info.st_mtime_ns, info.st_size)
+
+    mtime = filepath.modification_time()
+    return None if mtime is None else (mtime, None)
+
+##########################################################################################
@@ -0,0 +1,87 @@
+##########################################################################################
+# pdstemplate/_manifest.py
+##########################################################################################
+"""Manifest of the content hashes of the labels written into a directory."""
+
+import os
+import sqlite3
+import threading
+
+_MANIFEST_NAME = '.pdstemplate_manifest.sqlite'
+
+# Open connections, one per directory per thread and process
+_CONNECTIONS = threading.local()
+
+
+class _Manifest(object):
+    """The manifest of one output directory, stored as an SQLite database inside it.
+
+    For each label written in "sync" mode, the manifest records the SHA-256 digest of the
+    file's content, along with the file's size and modification time after it was
+    written. A label is unchanged if its new digest matches and the file's size and
+    modification time also match, so a file modified by other means is always rewritten.
+    The file itself is never read.
+
+    Parameters:
+        directory (str or Path): Path to the local directory.
+    """
+
+    def __init__(self, directory):
+
+        self.directory = str(directory)
+        connections = getattr(_CONNECTIONS, 'dict', None)
+        if connections is None:
+            connections = _CONNECTIONS.dict = {}
+
+        # A connection must not be shared with a forked process, and it must be replaced
+        # if the database file has been deleted
+        key = (os.getpid(), self.directory)
+        path = os.path.join(self.directory, _MANIFEST_NAME)
+        self.connection = connections.get(key)
+        if self.connection is not None and not os.path.exists(path):
+            self.connection.close()
+            self.connection = None
+
+        if self.connection is None:
+            self.connection = sqlite3.connect(path, timeout=60., isolation_level=None)
+            self.connection.execute('CREATE TABLE IF NOT EXISTS labels '
+                                    '(name TEXT PRIMARY KEY, digest TEXT, '
+                                    'size INTEGER, mtime_ns INTEGER)')
+            connections[key] = self.connection
+
+    def unchanged(self, name, digest):
+        """True if the named file exists and already has content with this digest.
+
+        Parameters:
+            name (str): Name of a file in the directory.
+            digest (str): The hexadecimal digest of the new content.
+
+        Returns:
+            bool: True if the file is unchanged.
+        """
+
+        row = self.connection.execute('SELECT digest, size, mtime_ns FROM labels '
+                                      'WHERE name = ?', (name,)).fetchone()
+        if row is None or row[0] != digest:
+            return False
+
+        try:
+            info = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return False
+
+        return (info.st_size, info.st_mtime_ns) == tuple(row[1:])
+
+    def record(self, name, digest):
+        """Record the digest of a file that has just been written.
+
+        Parameters:
+            name (str): Name of a file in the directory.
+            digest (str): The hexadecimal digest of its content.
+        """
+
+        info = os.stat(os.path.join(self.directory, name))
+        self.connection.execute('INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?)',
+                                (name, digest, info.st_size, info.st_mtime_ns))
+
+##########################################################################################
@@ -3,14 +3,17 @@
 ##########################################################################################
 """Class used internally during template evaluation."""
 
+import functools
 import re
+import time
 from collections import deque, namedtuple
-from xml.sax.saxutils import escape
 
 from filecache import FCPath
 
 from .utils import TemplateError, TemplateAbort, _RaisedException
 from .utils import get_logger, _NOESCAPE_FLAG
+from ._includes import _file_stamp
+from ._profile import _Profile
 
 # namedtuple class definition
 #
@@ -19,13 +22,93 @@ from .utils import get_logger, _NOESCAPE_FLAG
 #   header  the header type, e.g., "$FOR" or "$IF" or $END_IF";
 #   arg     any expression following the header, inside parentheses;
 #   line    the line number of the template in which the header appears;
-#   body    the text immediately following this header and up until the next header.
+#   body    the text immediately following this header and up until the next header,
+#           as a list of tokens alternating between literal text and _Expression tuples.
 #
 # When the template file is first read, it is described by a deque of _Section objects. If
 # there is no header before the first line of the template, it is assigned a header type
 # of "$ONCE().
 _Section = namedtuple('_Section', ['header', 'arg', 'line', 'body'])
 
+# This describes an expression embedded in the body text between a pair of "$":
+#   text    the text between the "$" characters;
+#   line    the line number of the opening "$", starting from 1;
+#   column  the column of the opening "$", starting from 1.
+_Expression = namedtuple('_Expression', ['text', 'line', 'column'])
+
+
+def _compile_expression(expression):
+    """Compile the given expression into a code object for repeated evaluation.
+
+    Leading blanks and tabs are ignored, matching the behavior of eval() on a string.
+
+    Parameters:
+        expression (str): Python expression to compile.
+
+    Returns:
+        code or None: The compiled code object; None if the expression is empty or cannot
+        be compiled. In the latter case, evaluating the expression from its source string
+        will raise the appropriate exception when the label is generated.
+    """
+
+    if not expression:
+        return None
+
+    try:
+        return compile(expression.lstrip(' \t'), '<string>', 'eval', dont_inherit=True)
+    except Exception:
+        return None
+
+
+def _code_names(code):
+    """The set of all names referenced by a code object, including any nested code such as
+    lambdas and comprehensions."""
+
+    names = set(code.co_names) | set(code.co_freevars)
+    for const in code.co_consts:
+        if isinstance(const, type(code)):
+            names |= _code_names(const)
+
+    return names
+
+
+def _all_blocks(blocks, notes=True):
+    """Iterator over the given blocks and every block nested inside them; if `notes` is
+    False, $NOTE blocks and their content are skipped."""
+
+    for block in blocks:
+        if not notes and isinstance(block, _PdsNoteBlock):
+            continue
+        yield block
+        nested = list(block.sub_blocks)
+        for attr in ('else_if_block', 'else_block'):
+            if getattr(block, attr, None):
+                nested.append(getattr(block, attr))
+        yield from _all_blocks(nested, notes)
+
+
+def _syntax_errors(blocks):
+    """A list of messages describing every expression in the given blocks that cannot be
+    compiled, each identified by its file name and line number, plus the column of the
+    opening "$" for an expression in the body text. $NOTE blocks are ignored."""
+
+    messages = []
+    for block in _all_blocks(blocks, notes=False):
+        name = block.filepath.name
+        expressions = [(block.arg, f'{name}:{block.line}', getattr(block, 'code', None))]
+        expressions += [(item[0], f'{name}:{item[2]}:{item[4]}', item[3])
+                        for k, item in enumerate(block.preprocessed) if k % 2 == 1]
+        for (expression, location, code) in expressions:
+            if not expression or code is not None:
+                continue
+            try:
+                compile(expression.lstrip(' \t'), '<string>', 'eval', dont_inherit=True)
+            except Exception as err:
+                messages.append(f'{type(err).__name__}({err}) in {expression} at '
+                                + location)
+
+    return messages
+
 
 class _PdsBlock(object):
     """_PdsBlock is an abstract class that describes a hierarchical section of the label
@@ -68,123 +151,165 @@ class _PdsBlock(object):
     _PdsForBlocks) its body and sub_blocks are written into the label file. Nesting is
     handled by having each _PdsBlock call the execute method of the _PdsBlocks nested
     within it.
+
+    All the label text is passed to a single output function, the "out" attribute of the
+    _LabelState, so each string is handled exactly once regardless of how deeply its block
+    is nested. The execute() methods are generators that yield None after each iteration
+    of a $FOR loop; these are the points at which the accumulated output can be flushed,
+    for example to a file, before generation continues.
     """
 
-    # This pattern matches a header record;
-    #  groups(1) = line number; groups(2) = header; groups(3) = argument in parentheses
     _HEADER_WORDS = ['IF', 'ELSE_IF', 'ELSE', 'END_IF', 'FOR', 'END_FOR', 'ONCE', 'NOTE',
                      'END_NOTE', 'INCLUDE']
 
-    # This regular expression splits up the content of the template at the location of
-    # each header. For each match, it returns three groups: a leading line number, the
-    # header word ("IF", "FOR", etc.), and text inside the parentheses, if any.
-    _HEADER_PATTERN = re.compile(r'(?<![^\n]) *\$(\d+):(' + '|'.join(_HEADER_WORDS)
-                                 + r')(\(.*\)|) *\n')
+    # This regular expression matches an entire header record, after trailing blanks have
+    # been stripped. It returns two groups: the header word ("IF", "FOR", etc.) and the
+    # argument in parentheses, if any.
+    _HEADER_PATTERN = re.compile(r' *\$(' + '|'.join(_HEADER_WORDS) + r')(\(.*\)|)')
 
     # This pattern matches an internal assignment within an expression;
     # group(0) = variable name; group(1) = expression
     NAMED_PATTERN = re.compile(r' *([A-Za-z_]\w*) *=([^=].*)')
     ELSE_HEADERS = {'$ELSE_IF', '$ELSE', '$END_IF'}
 
-    def preprocess_body(self):
-        """Preprocess body text from the template by locating all of the embedded Python
-        expressions and returning a list of substrings, where odd-numbered entries are the
-        expressions to evaluate, along with the associated line number.
-        """
-
-        # Split at the "$"
-        parts = self.body.split('$')
-        if len(parts) % 2 != 1:
-            line = parts[-1].partition(':')[0]
-            raise TemplateAbort(f'Mismatched "$" at {self.filepath.name}:{line}')
+    # Table for str.translate() that escapes XML text, like xml.sax.saxutils.escape()
+    _XML_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
 
-        # Because we inserted the line number after every "$", every part except the first
-        # now begins with a number followed by ":". We need to make the first item
-        # consistent with the others.
-        parts[0] = '0:' + parts[0]
+    # If constant expressions in the body have been evaluated at compile time, this is
+    # the original, preprocessed body; see _folding.py.
+    unfolded = None
 
-        # new_parts is a deque of values that alternates between label substrings and
-        # tuples (expression, name, line)
+    def preprocess_body(self):
+        """Preprocess the tokenized body text from the template into a deque of
+        substrings, where odd-numbered entries are tuples (expression, name, line, code,
+        column) describing the expressions to evaluate.
+        """
 
         new_parts = deque()
-        for k, part in enumerate(parts):
-
-            # Strip off the line number that we inserted after every "$"
-            (line, _, part) = part.partition(':')
+        for k, token in enumerate(self.body):
 
             # Even-numbered items are literal text
             if k % 2 == 0:
-                new_parts.append(part)
+                new_parts.append(token)
 
             # Odd-numbered are expressions, possibly with a name
             else:
 
                 # Look for a name
-                match = _PdsBlock.NAMED_PATTERN.fullmatch(part)
+                match = _PdsBlock.NAMED_PATTERN.fullmatch(token.text)
                 if match:
                     expression = match.group(2)
                     name = match.group(1)
                 else:
-                    expression = part
+                    expression = token.text
                     name = ''
 
-                new_parts.append((expression, name, int(line)))
+                new_parts.append((expression, name, token.line,
+                                  _compile_expression(expression), token.column))
 
         self.preprocessed = new_parts
 
-    def evaluate_expression(self, expression, line, state):
+    def evaluate_expression(self, expression, line, state, code=None, column=None):
         """Evaluate a single expression using the state's dictionaries as needed. Identify
-        the file name and line number if an error occurs.
+        the file name, line number, and column if an error occurs.
 
         Parameters:
             expression (str): Expression to evaluate.
             line (int): Line number in the template starting from 1.
             state (_LabelState): State describing the label being generated.
+            code (code, optional): The compiled version of the expression. If not
+                provided, the expression is compiled from its source on every call.
+            column (int, optional): Column of the opening "$" of an expression in the
+                body text, starting from 1; None for the argument of a header.
 
         Returns:
             str: The evaluated expression as a string.
         """
 
         if expression:
+            if state.profile is not None:
+                return self._evaluate_profiled(expression, line, state, code, column)
             try:
-                return eval(expression, state.global_dict, state.local_dicts[-1])
+                return eval(expression if code is None else code,
+                            state.global_dict, state.local_dicts[-1])
+            except Exception as err:
+                return self.expression_error(err, expression, line, state, column)
 
-            # Do not pass go, do not collect $200
-            except TemplateAbort:
-                raise
+        # An empty expression is just a "$" followed by another "$"
+        else:
+            return '$'      # "$$" maps to "$"
 
-            # This handles a call to $RAISE()
-            except _RaisedException as err:
-                suffix = f' at {self.filepath.name}:{line}'
-                if state.raise_exceptions:
-                    raise (err.exception)(err.message + suffix) from err
-                get_logger().error(err.exception.__name__ + ' ' + err.message + suffix,
-                                   state.label_path)
-                return (f'[[[{err.exception.__name__}({err.message}){suffix}]]]')
+    def _evaluate_profiled(self, expression, line, state, code, column):
+        """Version of evaluate_expression() that records the evaluation time in the
+        state's profile."""
 
-            except Exception as err:
-                # Attach the expression, file name and line number to the error message
-                suffix = f' in {expression} at {self.filepath.name}:{line}'
-                message = str(err) + suffix
-                if state.raise_exceptions:
-                    raise type(err)(message) from err
+        start = time.perf_counter()
+        try:
+            value = eval(expression if code is None else code,
+                         state.global_dict, state.local_dicts[-1])
+        except Exception as err:
+            value = self.expression_error(err, expression, line, state, column)
 
-                # Log with original stacktrace
-                try:
-                    raise type(err)(message) from err
-                except Exception as err2:
-                    get_logger().exception(err2, state.label_path,
-                                           more=self._more_error_info(self.line))
+        elapsed = time.perf_counter() - start
+        key = (self.filepath.name, line, 'EXPR', expression)
+        _Profile.record(state.profile, key, elapsed)
+        return value
 
-                # Return the content of the error message
-                if isinstance(err, TemplateError):
-                    return f'[[[{message}]]]'
+    def expression_error(self, err, expression, line, state, column=None):
+        """Handle an exception raised while evaluating an expression.
 
-                return f'[[[{type(err).__name__}({err})' + suffix + ']]]'
+        Parameters:
+            err (Exception): The exception raised.
+            expression (str): Expression that raised the exception.
+            line (int): Line number in the template starting from 1.
+            state (_LabelState): State describing the label being generated.
+            column (int, optional): Column of the opening "$" of an expression in the
+                body text, starting from 1; None for the argument of a header.
 
-        # An empty expression is just a "$" followed by another "$"
-        else:
-            return '$'      # "$$" maps to "$"
+        Returns:
+            str: The error message to embed in the label, surrounded by "[[[" and "]]]".
+
+        Raises:
+            TemplateAbort: If `err` is a TemplateAbort.
+            Exception: A copy of `err` with an expanded message, if
+                `state.raise_exceptions` is True.
+        """
+
+        # Do not pass go, do not collect $200
+        if isinstance(err, TemplateAbort):
+            raise err
+
+        location = f'{self.filepath.name}:{line}'
+        if column:
+            location += f':{column}'
+
+        # This handles a call to $RAISE()
+        if isinstance(err, _RaisedException):
+            suffix = ' at ' + location
+            if state.raise_exceptions:
+                raise (err.exception)(err.message + suffix) from err
+            get_logger().error(err.exception.__name__ + ' ' + err.message + suffix,
+                               state.label_path)
+            return (f'[[[{err.exception.__name__}({err.message}){suffix}]]]')
+
+        # Attach the expression, file name, line number, and column to the error message
+        suffix = f' in {expression} at {location}'
+        message = str(err) + suffix
+        if state.raise_exceptions:
+            raise type(err)(message) from err
+
+        # Log with original stacktrace
+        try:
+            raise type(err)(message) from err
+        except Exception as err2:
+            get_logger().exception(err2, state.label_path,
+                                   more=self._more_error_info(line))
+
+        # Return the content of the error message
+        if isinstance(err, TemplateError):
+            return f'[[[{message}]]]'
+
+        return f'[[[{type(err).__name__}({err})' + suffix + ']]]'
 
     @staticmethod
     def _is_error(value):
@@ -197,48 +322,114 @@ class _PdsBlock(object):
 
     def execute_body(self, state):
         """Generate the label text defined by this body, using the state's dictionaries to
-        fill in the blanks. The content is returned as a deque of strings, which are to be
-        joined upon completion to create the label.
+        fill in the blanks. The content is passed as a sequence of strings to the state's
+        output function.
 
         Parameters:
             state (_LabelState): State describing the label being generated.
-
-        Returns:
-            deque[str]: Deque of strings to concatenate.
         """
 
-        results = deque()
-        for k, item in enumerate(self.preprocessed):
+        if state.profile is not None:
+            self._execute_body_profiled(state)
+            return
+
+        parts = self.preprocessed
+        if self.unfolded is not None and state.unfold:
+            parts = self.unfolded
+        elif len(parts) == 1:
+            state.out(parts[0])
+            return
+
+        out = state.out
+        for k, item in enumerate(parts):
 
             # Even-numbered items are literal text
             if k % 2 == 0:
-                results.append(item)
+                out(item)
 
             # Odd-numbered items are expressions
             else:
-                (expression, name, line) = item
-                value = self.evaluate_expression(expression, line, state)
+                (expression, name, line, code, column) = item
+                value = self.evaluate_expression(expression, line, state, code, column)
 
                 if name and not _PdsBlock._is_error(value):
                     state.local_dicts[-1][name] = value
 
-                # Format a float without unnecessary trailing zeros
-                if isinstance(value, float):
-                    value = _PdsBlock._pretty_truncate(value, state.template.upper_e)
-                else:
-                    # Otherwise, just convert to string
-                    value = str(value)
+                out(_PdsBlock.format_value(value, self.template.xml,
+                                           state.template.upper_e, state.terminator))
 
-                # Escape
-                if self.template.xml:
-                    if value.startswith(_NOESCAPE_FLAG):
-                        value = value[len(_NOESCAPE_FLAG):]
-                    else:
-                        value = escape(value)
+    def _execute_body_profiled(self, state):
+        """Version of execute_body() that records the time and output of the body and of
+        each of its expressions in the state's profile."""
 
-                results.append(value)
+        start = time.perf_counter()
+        parts = self.preprocessed
+        if self.unfolded is not None and state.unfold:
+            parts = self.unfolded
 
-        return results
+        size = 0
+        for k, item in enumerate(parts):
+            if k % 2 == 0:
+                text = item
+            else:
+                (expression, name, line, code, column) = item
+                value = self.evaluate_expression(expression, line, state, code, column)
+                if name and not _PdsBlock._is_error(value):
+                    state.local_dicts[-1][name] = value
+
+                text = _PdsBlock.format_value(value, self.template.xml,
+                                              state.template.upper_e, state.terminator)
+                if expression:
+                    key = (self.filepath.name, line, 'EXPR', expression)
+                    state.profile[key][3] += len(text)
+
+            state.out(text)
+            size += len(text)
+
+        key = (self.filepath.name, self.line, self.header, '')
+        _Profile.record(state.profile, key, time.perf_counter() - start, size)
+
+    @staticmethod
+    def format_value(value, xml, upper_e, terminator='\n'):
+        """Convert the value of an evaluated expression to the text for the label.
+
+        Parameters:
+            value (any): Value of the expression.
+            xml (bool): True to escape the text for XML.
+            upper_e (bool): True to use uppercase "E" in exponential notation.
+            terminator (str, optional): The line terminator to replace any "\\n" in the
+                text.
+
+        Returns:
+            str: The text to appear in the label.
+        """
+
+        # Format a float without unnecessary trailing zeros; numbers never need escaping
+        if isinstance(value, float):
+            return _PdsBlock._pretty_truncate(value, upper_e)
+        if type(value) in (int, bool):
+            return str(value)
+
+        # Otherwise, just convert to string
+        value = str(value)
+
+        # Escape, but only if necessary
+        if xml:
+            if value.startswith(_NOESCAPE_FLAG):
+                value = value[len(_NOESCAPE_FLAG):]
+            elif '&' in value or '<' in value or '>' in value:
+                value = value.translate(_PdsBlock._XML_ESCAPES)
+
+        return _PdsBlock._terminate(value, terminator)
+
+    @staticmethod
+    def _terminate(text, terminator):
+        """The given text with its "\\n" line terminators replaced by `terminator`."""
+
+        if terminator == '\n' or '\n' not in text:
+            return text
+
+        return text.replace('\n', terminator)
 
     def execute(self, state):
         """Evaluate this block of label text, using the dictionaries to fill in the
@@ -250,16 +441,50 @@ class _PdsBlock(object):
         Parameters:
             state (_LabelState): State describing the label being generated.
 
-        Returns:
-            deque[str]: Deque of strings to concatenate.
+        Yields:
+            None: At each point where the output can be flushed.
         """
 
-        results = self.execute_body(state)
+        self.execute_body(state)
 
         for block in self.sub_blocks:
-            results += block.execute(state)
+            yield from block.execute(state)
 
-        return results
+    def referenced_names(self):
+        """The set of names referenced by the expressions in this block and in every block
+        nested within it.
+
+        Returns:
+            set[str] or None: The referenced names; None if they cannot be determined,
+            because the block contains an $INCLUDE or an expression that cannot be
+            compiled.
+        """
+
+        names = set()
+        expressions = [(item[0], item[3]) for k, item in enumerate(self.preprocessed)
+                       if k % 2 == 1 and item[0]]
+        if getattr(self, 'arg', ''):
+            expressions.append((self.arg, self.code))
+
+        for (expression, code) in expressions:
+            if code is None:
+                return None
+            names |= _code_names(code)
+
+        blocks = list(self.sub_blocks)
+        for attr in ('else_if_block', 'else_block'):
+            if getattr(self, attr, None):
+                blocks.append(getattr(self, attr))
+
+        for block in blocks:
+            if isinstance(block, _PdsIncludeBlock):
+                return None
+            block_names = block.referenced_names()
+            if block_names is None:
+                return None
+            names |= block_names
+
+        return names
 
     def _more_error_info(self, line):
         """The error info text to include following an exception.
@@ -275,8 +500,7 @@ class _PdsBlock(object):
         if not self.template._include_more_error_info:
             return ''
 
-        recs = self.template.content.split('\n')
-        return f'    {line}: ' + recs[line-1]
+        return f'    {line}: ' + self.template._content_line(line)
 
     ######################################################################################
     # "Compiler" from a list of template records into a deque of _PdsBlock objects
@@ -296,44 +520,17 @@ class _PdsBlock(object):
 
         Returns:
             deque[_PdsBlock]: A deque of _PdsBlock objects representing the entire content
-                of the template.
-        """
-
-        # Strip inline comments
-        content = _PdsBlock._strip_inline_comments(content)
+                of the template. The literal text uses the template's line terminator.
 
-        # We need to save the line number in which each expression appears so that error
-        # messages can be informative. To handle this, we temporarily write the line
-        # number followed by a colon after each "$" found in the template.
+        Raises:
+            TemplateAbort: If the template has a structural error or if any expression is
+                invalid; in the latter case, the message lists every invalid expression.
+        """
 
-        # Insert line numbers after each "$"
-        records = content.split('\n')
-        numbered = [rec.rstrip().replace('$', f'${k+1}:')
-                    for k, rec in enumerate(records)]
-        content = '\n'.join(numbered)
-
-        # Split based on headers. The entire template is split into substrings...
-        # 0: text before the first header, if any
-        # 1: line number of the header
-        # 2: header word ("IF", "FOR", etc.)
-        # 3: text between parentheses in the header line
-        # 4: template text from here to the next header line
-        # 5: line number of the next header
-        # etc.
-        parts = _PdsBlock._HEADER_PATTERN.split(content)
-
-        # parts[0] is '' if the file begins with a header, or else it is the body text
-        # before the first header. The first header is always described by parts[1:4];
-        # every part indexed 4*N + 1 is a line number.
-
-        # Create a list of (header, arg, line, body) tuples, skipping parts[0]
-        sections = [_Section('$'+h, a, int(l), b) for (l, h, a, b)
-                    in zip(parts[1::4], parts[2::4], parts[3::4], parts[4::4])]
-
-        # Convert to deque and prepend the leading body text if necessary
-        sections = deque(sections)
-        if parts[0]:
-            sections.appendleft(_Section('$ONCE', '', 0, parts[0]))
+        # Split the content into sections, one per header, with the position of every
+        # expression
+        name = FCPath(filepath).name if filepath else template.template_path.name
+        sections = _PdsBlock._tokenize(content, name)
 
         # Convert the sections into a list of execution blocks
         # Each call to _PdsBlock.new_block pops one or more items off top of the deque;
@@ -347,6 +544,22 @@ class _PdsBlock(object):
             # associated "END_IF". Calls are recursive, so this handles nesting correctly.
             blocks.append(_PdsBlock.new_block(sections, template, filepath=filepath))
 
+        # Report every invalid expression now, rather than in every label generated
+        messages = _syntax_errors(blocks)
+        if messages:
+            plural = 's' if len(messages) > 1 else ''
+            raise TemplateAbort(f'{len(messages)} invalid expression{plural}: '
+                                + '; '.join(messages))
+
+        # Put the template's line terminator into the literal text now, rather than into
+        # every generated label
+        terminator = template.terminator
+        if terminator != '\n':
+            for block in _all_blocks(blocks):
+                parts = block.preprocessed
+                block.preprocessed = deque(part.replace('\n', terminator) if k % 2 == 0
+                                           else part for k, part in enumerate(parts))
+
         return blocks
 
     @staticmethod
@@ -394,22 +607,81 @@ class _PdsBlock(object):
                             f'{filepath.name}:{line}')  # pragma: no coverage
 
     @staticmethod
-    def _strip_inline_comments(content):
-        """Strip inline comments from the given content."""
-
-        lines = content.split('\n')
-        comment = '$NOTE:'
-        newlines = []
-        for line in lines:
-            parts = line.partition(comment)
-            if parts[1]:                # if $NOTE found
-                if parts[0] == '':      # remove entire line
+    def _tokenize(content, filename):
+        """Split the template content into a deque of _Section objects in a single pass.
+
+        Inline comments are removed, trailing blanks are stripped from every record, and
+        the body text of each section is split into a list of tokens alternating between
+        literal text and _Expression tuples. If there is text before the first header, the
+        first section has header "$ONCE" and line number zero.
+
+        Parameters:
+            content (str): The entire content of the template as a single string with <LF>
+                line terminators.
+            filename (str): Name of the source file, for error messages.
+
+        Returns:
+            deque[_Section]: The sections of the template.
+
+        Raises:
+            TemplateAbort: If a "$" is unmatched within the body text of a section.
+        """
+
+        sections = deque()
+        (header, arg, header_line) = ('$ONCE', '', 0)
+        tokens = []         # tokens of the current section's body
+        pieces = []         # pieces of the text of the current token
+        start = None        # (line, column) of the opening "$" of an open expression
+
+        def end_section():
+            if start:
+                raise TemplateAbort(f'Mismatched "$" at {filename}:{start[0]}:{start[1]}')
+            tokens.append(''.join(pieces))
+            if header_line or len(tokens) > 1 or tokens[0]:
+                sections.append(_Section(header, arg, header_line, tokens))
+
+        records = content.split('\n')
+        last = len(records)
+        for (line, record) in enumerate(records, start=1):
+            newline = '' if line == last else '\n'
+
+            # Strip an inline comment; a record containing only a comment disappears
+            if '$NOTE:' in record:
+                record = record.partition('$NOTE:')[0]
+                if not record:
                     continue
-                newlines.append(parts[0].rstrip())
-            else:
-                newlines.append(line)
 
-        return '\n'.join(newlines)
+            record = record.rstrip()
+            if '$' not in record:
+                pieces.append(record + newline)
+                continue
+
+            # A header record begins a new section
+            match = _PdsBlock._HEADER_PATTERN.fullmatch(record) if newline else None
+            if match:
+                end_section()
+                (header, arg, header_line) = ('$' + match.group(1), match.group(2), line)
+                (tokens, pieces) = ([], [])
+                continue
+
+            # Alternate between literal text and expressions at each "$"
+            parts = record.split('$')
+            pieces.append(parts[0])
+            column = len(parts[0]) + 1
+            for part in parts[1:]:
+                if start:
+                    tokens.append(_Expression(''.join(pieces), *start))
+                    start = None
+                else:
+                    tokens.append(''.join(pieces))
+                    start = (line, column)
+                pieces = [part]
+                column += len(part) + 1
+
+            pieces.append(newline)
+
+        end_section()
+        return sections
 
     ######################################################################################
     # Utility
@@ -426,6 +698,8 @@ class _PdsBlock(object):
         This eliminates numbers like "1.0000000000000241" and "0.9999999999999865" in the
         label, by suppressing insignificant digits.
 
+        Results are memoized, because the same values often recur within and among labels.
+
         Parameters:
             value (float): Value to format as a string.
             upper_e (bool): True to use uppercase "E" in exponential notation.
@@ -434,6 +708,17 @@ class _PdsBlock(object):
             str: Formatted string.
         """
 
+        # Zero is excluded from the memo because 0. and -0. are equal but formatted
+        # differently; NaN would never be found in the memo anyway
+        if value == 0. or value != value:
+            return _PdsBlock._pretty_truncate_unmemoized(value, upper_e)
+
+        return _PdsBlock._pretty_truncate_memo(value, upper_e)
+
+    @staticmethod
+    def _pretty_truncate_unmemoized(value, upper_e):
+        """Internal version of _pretty_truncate() without the memo."""
+
         str_value = str(value)
 
         (mantissa, e, exponent) = str_value.partition('e')
@@ -446,6 +731,10 @@ class _PdsBlock(object):
         if '.' not in mantissa:         # always a decimal point in the mantissa
             return mantissa + '.' + e + exponent
 
+        # The patterns below only match a long run of zeros or nines
+        if '0000000000' not in mantissa and '9999999999' not in mantissa:
+            return str_value
+
         # Handle trailing zeros
         match = _PdsBlock._ZEROS.fullmatch(mantissa)
         if match:
@@ -473,6 +762,11 @@ class _PdsBlock(object):
         return str(value).rstrip('0') + e + exponent
 
 
+# A bounded memo of _pretty_truncate() results; float subclasses are memoized separately
+_PdsBlock._pretty_truncate_memo = functools.lru_cache(maxsize=4096, typed=True)(
+                                        _PdsBlock._pretty_truncate_unmemoized)
+
+
 ################################################
 
 class _PdsOnceBlock(_PdsBlock):
@@ -523,6 +817,7 @@ class _PdsOnceBlock(_PdsBlock):
         match = _PdsOnceBlock.PATTERN.fullmatch(arg)
         if match:
             (self.name, self.arg) = match.groups()
+        self.code = _compile_expression(self.arg)
 
         if header.startswith('$ONCE-') and arg:  # pragma: no coverage
             # This can't happen in the current code because IF, FOR, and NOTE all
@@ -538,29 +833,27 @@ class _PdsOnceBlock(_PdsBlock):
         Parameters:
             state (_LabelState): State describing the label being generated.
 
-        Returns:
-            deque[str]: Deque of strings to concatenate upon completion.
+        Yields:
+            None: At each point where the output can be flushed.
         """
 
-        results = deque()
-
         # Pop the local dictionary stack if necessary
         if self.pop_local_dict:
             state.local_dicts.pop()
 
         # Define the local variable if necessary
         if self.arg:
-            value = self.evaluate_expression(self.arg, self.line, state)
+            value = self.evaluate_expression(self.arg, self.line, state, self.code)
             if _PdsBlock._is_error(value):
-                return deque([value])
+                state.out(_PdsBlock._terminate(value, state.terminator))
+                return
 
             # Write new values into the local dictionary, not a copy
             if self.name:
                 state.local_dicts[-1][self.name] = value
 
         # Include the body and any sub-blocks exactly once
-        results += _PdsBlock.execute(self, state)
-        return results
+        yield from _PdsBlock.execute(self, state)
 
 
 ################################################
@@ -621,11 +914,11 @@ class _PdsNoteBlock(_PdsBlock):
         Parameters:
             state (_LabelState): State describing the label being generated.
 
-        Returns:
-            deque[str]: Deque of strings to concatenate upon completion.
+        Yields:
+            None: Nothing.
         """
 
-        return deque()
+        yield from ()
 
 
 ################################################
@@ -642,6 +935,8 @@ class _PdsForBlock(_PdsBlock):
     PATTERN2 = re.compile(r'\(' + WORD + ',' + WORD + r'=([^=].*)\)')
     PATTERN3 = re.compile(r'\(' + WORD + ',' + WORD + ',' + WORD + r'=([^=].*)\)')
 
+    uses_length = True      # True if the loop body might refer to LENGTH
+
     def __init__(self, sections, template, filepath=None):
         """Define a block to be executed inside a loop. Pop the associated section off the
         stack.
@@ -691,6 +986,8 @@ class _PdsForBlock(_PdsBlock):
                     self.length = groups[2]
                 break
 
+        self.code = _compile_expression(self.arg)
+
         # Save internal sub-blocks until the $END_FOR is found
         self.sub_blocks = deque()
         while sections and sections[0].header != '$END_FOR':
@@ -700,6 +997,10 @@ class _PdsForBlock(_PdsBlock):
             raise TemplateAbort(f'Unterminated {header} block starting at '
                                 f'{self.filepath.name}:{line}')
 
+        # The iterable is only converted to a list if its length is needed but unknown
+        names = self.referenced_names()
+        self.uses_length = names is None or self.length in names
+
         # Handle the matching $END_FOR section as $ONCE
         (header, arg, line, body) = sections[0]
         sections[0] = _Section('$ONCE-' + header, '', line, body)
@@ -712,26 +1013,38 @@ class _PdsForBlock(_PdsBlock):
         Parameters:
             state (_LabelState): State describing the label being generated.
 
-        Returns:
-            deque[str]: Deque of strings to concatenate upon completion.
+        Yields:
+            None: At each point where the output can be flushed.
         """
 
-        iterator = self.evaluate_expression(self.arg, self.line, state)
+        # Create a new local dictionary; it is popped by the matching $END_FOR
+        iterator = self.evaluate_expression(self.arg, self.line, state, self.code)
+        # A copy, not a ChainMap: frames hold only loop variables and lookups were slower
+        state.local_dicts.append(state.local_dicts[-1].copy())
         if _PdsBlock._is_error(iterator):
-            return deque([iterator])    # include the error text inside the label
+            # Include the error text inside the label
+            state.out(_PdsBlock._terminate(iterator, state.terminator))
+            return
 
-        # Create a new local dictionary
-        state.local_dicts.append(state.local_dicts[-1].copy())
+        if self.uses_length:
+            (iterator, state.local_dicts[-1][self.length]) = _PdsForBlock._sized(iterator)
 
-        results = deque()
-        iterator = list(iterator)
-        state.local_dicts[-1][self.length] = len(iterator)
         for k, item in enumerate(iterator):
             state.local_dicts[-1][self.value] = item
             state.local_dicts[-1][self.index] = k
-            results += _PdsBlock.execute(self, state)
+            yield from _PdsBlock.execute(self, state)
+            yield
 
-        return results
+    @staticmethod
+    def _sized(iterable):
+        """The iterable and its length, converting it to a list only if its length is not
+        otherwise available."""
+
+        try:
+            return (iterable, len(iterable))
+        except TypeError:
+            iterable = list(iterable)
+            return (iterable, len(iterable))
 
 
 ################################################
@@ -780,6 +1093,7 @@ class _PdsIfBlock(_PdsBlock):
         match = _PdsIfBlock.PATTERN.fullmatch(arg)
         if match:
             (self.name, self.arg) = match.groups()
+        self.code = _compile_expression(self.arg)
 
         self.else_if_block = None
         self.else_block = None
@@ -815,32 +1129,33 @@ class _PdsIfBlock(_PdsBlock):
         Parameters:
             state (_LabelState): State describing the label being generated.
 
-        Returns:
-            deque[str]: Deque of strings to concatenate upon completion.
+        Yields:
+            None: At each point where the output can be flushed.
         """
 
-        status = self.evaluate_expression(self.arg, self.line, state)
-        if _PdsBlock._is_error(status):
-            return deque([status])      # include the error text inside the label
-
-        # Create a new local dictionary for IF but not ELSE_IF
+        # Create a new local dictionary for IF but not ELSE_IF; it is popped by the
+        # matching $END_IF
+        status = self.evaluate_expression(self.arg, self.line, state, self.code)
         if self.header == '$IF':
+            # A copy, not a ChainMap: frames are small and ChainMap lookups were slower
             state.local_dicts.append(state.local_dicts[-1].copy())
 
+        if _PdsBlock._is_error(status):
+            # Include the error text inside the label
+            state.out(_PdsBlock._terminate(status, state.terminator))
+            return
+
         if self.name:
             state.local_dicts[-1][self.name] = status
 
         if status:
-            return _PdsBlock.execute(self, state)
+            yield from _PdsBlock.execute(self, state)
 
         elif self.else_if_block:
-            return self.else_if_block.execute(state)
+            yield from self.else_if_block.execute(state)
 
         elif self.else_block:
-            return self.else_block.execute(state)
-
-        else:
-            return deque()  # empty response
+            yield from self.else_block.execute(state)
 
 
 ################################################
@@ -928,6 +1243,8 @@ class _PdsIncludeBlock(_PdsBlock):
             raise TemplateAbort(f'Missing argument for {header} at '
                                 f'{self.filepath.name}:{line}')
 
+        self.code = _compile_expression(self.arg)
+
     def execute(self, state):
         """Read, compile, and execute the specified file, followed by the remaining body
         text.
@@ -937,23 +1254,23 @@ class _PdsIncludeBlock(_PdsBlock):
         Parameters:
             state (_LabelState): State describing the label being generated.
 
-        Returns:
-            deque[str]: Deque of strings to concatenate upon completion.
+        Yields:
+            None: At each point where the output can be flushed.
         """
 
-        results = deque()
-
         # Interpret the file name
-        filename = self.evaluate_expression(self.arg, self.line, state)
+        filename = self.evaluate_expression(self.arg, self.line, state, self.code)
         if _PdsBlock._is_error(filename):
-            return deque(['$INCLUDE(', filename, ')\n'])  # put error text into the label
+            # Put the error text into the label
+            state.out(_PdsBlock._terminate('$INCLUDE(' + filename + ')\n',
+                                           state.terminator))
+            return
 
-        # Read the file
+        # Read and compile the file, or retrieve the compiled blocks from the cache
         try:
-            content = _PdsIncludeBlock.get_content(filename,
-                                                   self.template._include_dirs())
+            blocks = self.get_blocks(filename)
         except Exception as err:
-            message = f'{repr(err)} in $INCLUDE at {state.filepath.name}:{self.line}'
+            message = f'{repr(err)} in $INCLUDE at {self.filepath.name}:{self.line}'
             if state.raise_exceptions:
                 raise type(err)(message) from err
             try:
@@ -961,50 +1278,86 @@ class _PdsIncludeBlock(_PdsBlock):
             except Exception as err:
                 get_logger().exception(err, state.label_path,
                                        more=self._more_error_info(self.line))
-            return deque(['$INCLUDE(', filename, ')\n'])  # put error text into the label
+            # Put the error text into the label
+            state.out(_PdsBlock._terminate('$INCLUDE(' + filename + ')\n',
+                                           state.terminator))
+            return
 
-        # Compile and execute the included template
-        blocks = _PdsBlock.process_headers(content, self.template, filepath=self.filepath)
+        # Execute the included template
         for block in blocks:
-            results += block.execute(state)
+            yield from block.execute(state)
 
         # Include the body and any sub-blocks afterward
-        results += _PdsBlock.execute(self, state)
-        return results
+        yield from _PdsBlock.execute(self, state)
 
-    @staticmethod
-    def get_content(filename, include_dirs):
-        """The content of the specified include file.
+    def get_blocks(self, filename):
+        """The compiled content of the specified include file.
+
+        Compiled include files are cached inside the template, keyed by the file name. The
+        template's `include_cache` attribute determines how the cache is used:
+
+        - "check": Locate the file and use the cached blocks only if the resolved path,
+          modification time, and size are unchanged.
+        - "static": Use the cached blocks without checking the file again.
+        - "off": Always read and compile the file.
 
         Parameters:
             filename (str, Path, or FCPath): The name or path to the file to include.
-            include_dirs (list[Path or FCPath): Ordered list of directories in which to
-                look for the named file.
 
         Returns:
-            str: The content of the file as a single string containing "\n" line
-                terminators.
+            deque[_PdsBlock]: The compiled blocks of the include file.
 
         Raises:
             FileNotFoundError: If the file is not found.
             OSError: Any subclass of OSError explaining why the file could not be read.
         """
 
-        # First try to read the file directly
-        filepath = FCPath(filename)
+        template = self.template
+        mode = template.include_cache
+        if mode == 'off':
+            content = _PdsIncludeBlock.get_content(filename, template._resolver)
+            return _PdsBlock.process_headers(content, template, filepath=self.filepath)
+
+        key = (str(filename), str(self.filepath))
+        cached = template._include_cache.get(key)
+        if cached and mode == 'static':
+            return cached[1]
+
+        # Locate the file; if it has vanished, search for it again
+        resolver = template._resolver
+        filepath = resolver.resolve(filename)
         try:
-            return filepath.read_text()     # convert <CR><LF> to <LF>
+            stamp = _file_stamp(filepath)
         except FileNotFoundError:
-            pass
+            resolver.forget(filename)
+            filepath = resolver.resolve(filename)
+            stamp = _file_stamp(filepath)
 
-        # Try each directory in turn
-        for dir in include_dirs:
-            try:
-                return (dir / filename).read_text()
-            except (FileNotFoundError, NotImplementedError):
-                pass
+        if cached and stamp is not None and cached[0] == (str(filepath), stamp):
+            return cached[1]
+
+        content = filepath.read_text()
+        blocks = _PdsBlock.process_headers(content, template, filepath=self.filepath)
+        template._include_cache[key] = ((str(filepath), stamp), blocks)
+        return blocks
+
+    @staticmethod
+    def get_content(filename, resolver):
+        """The content of the specified include file.
+
+        Parameters:
+            filename (str, Path, or FCPath): The name or path to the file to include.
+            resolver (_IncludeResolver): The object that locates include files.
+
+        Returns:
+            str: The content of the file as a single string containing "\n" line
+                terminators.
+
+        Raises:
+            FileNotFoundError: If the file is not found.
+            OSError: Any subclass of OSError explaining why the file could not be read.
+        """
 
-        # On failure, re-raise the first exception
-        return filepath.read_text()
+        return resolver.read_text(filename)
 
 ##########################################################################################
@@ -0,0 +1,100 @@
+##########################################################################################
+# pdstemplate/_profile.py
+##########################################################################################
+"""Timing statistics for the expressions and blocks of a template."""
+
+import threading
+
+
+class _Profile(object):
+    """The accumulated timing statistics of a template's expressions and blocks.
+
+    Each entry is keyed by a tuple (file name, line number, kind, text), where `kind` is
+    "EXPR" for an expression, in which case `text` is the expression, or else the block's
+    header (e.g., "$FOR"), in which case `text` is empty. Each value is a list [count,
+    total seconds, maximum seconds, output characters].
+
+    For an expression, the time is that of its evaluation and the output is the text it
+    inserted into the label. For a block, the time is that of the block's body text,
+    including its embedded expressions but excluding its header expression and any nested
+    blocks; the output is all of the body's text.
+    """
+
+    def __init__(self):
+
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def record(stats, key, elapsed, size=0):
+        """Add one timing to the given dictionary of statistics.
+
+        Parameters:
+            stats (dict): Dictionary of statistics for one label.
+            key (tuple): The key (file name, line number, kind, text).
+            elapsed (float): Elapsed time in seconds.
+            size (int, optional): The number of characters output.
+        """
+
+        entry = stats.get(key)
+        if entry is None:
+            stats[key] = [1, elapsed, elapsed, size]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[3] += size
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+
+    def merge(self, stats):
+        """Merge the statistics of one label into this profile.
+
+        Parameters:
+            stats (dict): Dictionary of statistics for one label.
+        """
+
+        with self._lock:
+            for (key, (count, total, max_, size)) in stats.items():
+                entry = self.stats.get(key)
+                if entry is None:
+                    self.stats[key] = [count, total, max_, size]
+                else:
+                    entry[0] += count
+                    entry[1] += total
+                    entry[2] = max(entry[2], max_)
+                    entry[3] += size
+
+    def clear(self):
+        """Discard all statistics."""
+
+        with self._lock:
+            self.stats.clear()
+
+    def report(self, limit=20):
+        """A table of the statistics, ranked by total time.
+
+        Parameters:
+            limit (int, optional): Maximum number of rows; None for all.
+
+        Returns:
+            str: The table.
+        """
+
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda item: -item[1][1])
+
+        if limit is not None:
+            items = items[:limit]
+
+        lines = [f'{"total(s)":>10} {"count":>8} {"mean(ms)":>10} {"max(ms)":>10} '
+                 f'{"chars":>10}  location']
+        for ((filename, line, kind, text), (count, total, max_, size)) in items:
+            location = f'{filename}:{line} {kind}'
+            if text:
+                location += ' ' + text.strip()
+            lines.append(f'{total:10.4f} {count:8d} {1000 * total / count:10.4f} '
+                         f'{1000 * max_:10.4f} {size:10d}  {location}')
+
+        return '\n'.join(lines) + '\n'
+
+##########################################################################################
@@ -51,6 +51,7 @@ label will always contain the correct numbers of ROWS and COLUMNS. :meth:`TABLE_
 also retrieve information about the content and format about each of the table's columns.
 """
 
+import contextvars
 import re
 
 from filecache import FCPath
@@ -62,8 +63,10 @@ from .utils import get_logger, TemplateError, TemplateAbort, _check_terminators
 # Pre-defined template functions
 ##########################################################################################
 
-# For global access to the latest table
-_LATEST_ASCII_TABLE = None
+# For global access to the latest table. This is a context variable so that each label
+# being generated refers to its own table, even when labels are generated in parallel.
+_LATEST_ASCII_TABLE = contextvars.ContextVar('pdstemplate_latest_ascii_table',
+                                             default=None)
 
 
 def ANALYZE_TABLE(filepath, *, separator=',', crlf=None, escape=''):
@@ -87,14 +90,12 @@ def ANALYZE_TABLE(filepath, *, separator=',', crlf=None, escape=''):
             disallowed.
     """
 
-    global _LATEST_ASCII_TABLE
-    _LATEST_ASCII_TABLE = None
+    _LATEST_ASCII_TABLE.set(None)
 
     logger = get_logger()
     logger.debug('Analyzing ASCII table', filepath)
     try:
-        _LATEST_ASCII_TABLE = AsciiTable(filepath, separator=separator, crlf=crlf,
-                                         escape=escape)
+        AsciiTable(filepath, separator=separator, crlf=crlf, escape=escape)
     except Exception as err:
         logger.exception(err)
 
@@ -142,11 +143,12 @@ def TABLE_VALUE(name, column=0):
         TemplateError: A wrapper for any other exception.
     """
 
-    if not _LATEST_ASCII_TABLE:
+    table = _LATEST_ASCII_TABLE.get()
+    if not table:
         raise TemplateAbort('No ASCII table has been analyzed')
 
     try:
-        return _LATEST_ASCII_TABLE.lookup(name, column)
+        return table.lookup(name, column)
     except Exception as err:
         raise TemplateError(err) from err
 
@@ -154,14 +156,20 @@ def TABLE_VALUE(name, column=0):
 def _latest_ascii_table():
     """The most recently defined AsciiTable object. Provided for global access."""
 
-    return _LATEST_ASCII_TABLE
+    return _LATEST_ASCII_TABLE.get()
+
+
+def _set_ascii_table(table):
+    """Define the AsciiTable object to be used by TABLE_VALUE."""
+
+    _LATEST_ASCII_TABLE.set(table)
+    PdsTemplate.define_global('TABLE_VALUE', TABLE_VALUE)
 
 
 def _reset_ascii_table():
     """Reset the most recently defined AsciiTable object to None, for debugging."""
 
-    global _LATEST_ASCII_TABLE
-    _LATEST_ASCII_TABLE = None
+    _LATEST_ASCII_TABLE.set(None)
 
 
 PdsTemplate.define_global('ANALYZE_TABLE', ANALYZE_TABLE)
@@ -206,8 +214,6 @@ class AsciiTable():
                 strings are disallowed.
         """
 
-        global _LATEST_ASCII_TABLE
-
         self.filepath = FCPath(filepath)
 
         if separator not in ',;|\t':
@@ -310,8 +316,7 @@ class AsciiTable():
             self._formats.append(self._column_format(column, colno))
 
         # Provide global access
-        _LATEST_ASCII_TABLE = self
-        PdsTemplate.define_global('TABLE_VALUE', self.lookup)
+        _set_ascii_table(self)
 
     def _column_format(self, column, colno):
         """Derived the format for the entire column, handling possible mixed formats.
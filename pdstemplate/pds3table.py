@@ -168,21 +168,44 @@ preprocessor let you indicate whether to include FORMATs, COLUMN_NUMBERs, and th
 MINIMUM/MAXIMUM_VALUEs attributes automatically.
 """
 
+import contextvars
+import copy
 import re
 import warnings
 
 from filecache import FCPath
 
 from . import PdsTemplate
-from .asciitable import ANALYZE_TABLE, TABLE_VALUE, _latest_ascii_table
+from .asciitable import ANALYZE_TABLE, TABLE_VALUE, _latest_ascii_table, _set_ascii_table
 from .utils import get_logger, TemplateError, TemplateAbort, _check_terminators
 
 ##########################################################################################
 # Pre-defined template functions
 ##########################################################################################
 
-# For global access to the latest table
-_LATEST_PDS3_TABLE = None
+# For global access to the latest table. This is a context variable so that each label
+# being generated refers to its own table, even when labels are generated in parallel.
+_LATEST_PDS3_TABLE = contextvars.ContextVar('pdstemplate_latest_pds3_table',
+                                            default=None)
+
+
+def _assigned_pds3_table():
+    """The most recently defined Pds3Table object, assigned to the most recently analyzed
+    AsciiTable if any.
+
+    A Pds3Table defined by the preprocessor is shared by every label generated from the
+    template, so it is not re-assigned in place. Instead, a copy is assigned to the new
+    table and replaces the original within the current context.
+    """
+
+    pds3_table = _LATEST_PDS3_TABLE.get()
+    table = _latest_ascii_table()
+    if pds3_table and table and pds3_table.table is not table:
+        pds3_table = copy.copy(pds3_table)
+        pds3_table.assign_to(table)
+        _LATEST_PDS3_TABLE.set(pds3_table)
+
+    return pds3_table
 
 
 def ANALYZE_PDS3_LABEL(labelpath, *, validate=True):
@@ -199,12 +222,10 @@ def ANALYZE_PDS3_LABEL(labelpath, *, validate=True):
             the template. Otherwise, warnings will be corrected silently.
     """
 
-    global _LATEST_PDS3_TABLE
-
     get_logger().debug('Analyzing PDS3 label', labelpath)
-    _LATEST_PDS3_TABLE = Pds3Table(labelpath, validate=False, analyze_only=True)
+    Pds3Table(labelpath, validate=False, analyze_only=True)
     if validate:
-        return Pds3Table._validate_inside_template(_LATEST_PDS3_TABLE,
+        return Pds3Table._validate_inside_template(_assigned_pds3_table(),
                                                    hide_warnings=False,
                                                    abort_on_error=False)
 
@@ -222,8 +243,9 @@ def VALIDATE_PDS3_LABEL(hide_warnings=False, abort_on_error=True):
         int: The number of warnings issued.
     """
 
-    get_logger().debug('Validating PDS3 label', _LATEST_PDS3_TABLE.labelpath)
-    return Pds3Table._validate_inside_template(_LATEST_PDS3_TABLE,
+    pds3_table = _assigned_pds3_table()
+    get_logger().debug('Validating PDS3 label', pds3_table.labelpath)
+    return Pds3Table._validate_inside_template(pds3_table,
                                                hide_warnings=hide_warnings,
                                                abort_on_error=abort_on_error)
 
@@ -276,14 +298,13 @@ def LABEL_VALUE(name, column=0):
         int, float, str, or None: The correct value for the specified parameter.
     """
 
-    if not _LATEST_PDS3_TABLE:
+    # Make sure we're referring to the latest AsciiTable
+    pds3_table = _assigned_pds3_table()
+    if not pds3_table:
         raise TemplateAbort('No PDS3 label has been analyzed')
 
-    if _latest_ascii_table():       # make sure we're referring to the latest AsciiTable
-        _LATEST_PDS3_TABLE.assign_to()
-
     try:
-        return _LATEST_PDS3_TABLE.lookup(name, column)
+        return pds3_table.lookup(name, column)
     except Exception as err:
         raise TemplateError(err) from err
 
@@ -312,15 +333,15 @@ def OLD_LABEL_VALUE(name, column=0):
     """
 
     try:
-        return _LATEST_PDS3_TABLE.old_lookup(name, column)
+        return _LATEST_PDS3_TABLE.get().old_lookup(name, column)
     except Exception as err:
         raise TemplateError(err) from err
 
 
 def _latest_pds3_table():
-    """The most recently defined AsciiTable object. Provided for global access."""
+    """The most recently defined Pds3Table object. Provided for global access."""
 
-    return _LATEST_PDS3_TABLE
+    return _LATEST_PDS3_TABLE.get()
 
 
 PdsTemplate.define_global('ANALYZE_PDS3_LABEL', ANALYZE_PDS3_LABEL)
@@ -447,8 +468,6 @@ class Pds3Table():
                 only contains integers.
         """
 
-        global _LATEST_PDS3_TABLE
-
         self.labelpath = FCPath(labelpath)
         if not label:
             label = self.labelpath.read_bytes()     # binary to preserve terminators
@@ -542,7 +561,7 @@ class Pds3Table():
         self.table = None
 
         # Set globals for access within the template object
-        _LATEST_PDS3_TABLE = self
+        _LATEST_PDS3_TABLE.set(self)
         PdsTemplate.define_global('VALIDATE_PDS3_LABEL', VALIDATE_PDS3_LABEL)
         PdsTemplate.define_global('LABEL_VALUE', LABEL_VALUE)
         PdsTemplate.define_global('OLD_LABEL_VALUE', OLD_LABEL_VALUE)
@@ -743,7 +762,7 @@ class Pds3Table():
             self._unique_values_ = [None for _ in self._column_values] + [None]
             self._unique_valids_ = [None for _ in self._column_values] + [None]
 
-        PdsTemplate.define_global('TABLE_VALUE', self.table.lookup)
+        _set_ascii_table(self.table)
 
     _TABLE_NAME_REGEX = re.compile(r'.*\^\w*TABLE *= *"?(\w+\.\w+)"? *\r?\n', re.DOTALL)
 
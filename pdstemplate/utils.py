@@ -9,6 +9,13 @@ pdstemplate.utils
 Utility functions and classes.
 """
 
+import collections
+import contextlib
+import contextvars
+import itertools
+import logging
+import threading
+
 from filecache import FCPath
 from pdslogger import PdsLogger, LoggerError
 
@@ -64,9 +71,45 @@ def set_logger(logger):
 
 
 def get_logger():
-    """The global PdsLogger for PdsTemplate and associated tools."""
+    """The global PdsLogger for PdsTemplate and associated tools.
 
-    return _LOGGER
+    While a label is being generated in a thread other than the main thread, this is a
+    child of the global PdsLogger, or of the batch's logger within
+    :func:`quiet_logging`, that is unique to that thread. Its messages go to the same
+    handlers, but its logging hierarchy is kept separate.
+    """
+
+    logger = _CONTEXT_LOGGER.get()
+    return _LOGGER if logger is None else logger
+
+
+# The logger to use in the current context, if not the global logger
+_CONTEXT_LOGGER = contextvars.ContextVar('pdstemplate_logger', default=None)
+
+# Each thread's child logger, and the global logger it was derived from
+_THREAD_LOGGERS = threading.local()
+_THREAD_IDS = itertools.count(1)
+
+
+def _use_thread_logger():
+    """Within the current context, use a logger unique to the current thread, unless
+    this is the main thread.
+
+    Within a batch, the thread's logger is a child of the batch's logger, so that its
+    messages are included in the batch summary; see quiet_logging().
+    """
+
+    if threading.current_thread() is threading.main_thread():
+        return
+
+    logger = _BATCH_LOGGER.get() or _LOGGER
+    (parent, child) = getattr(_THREAD_LOGGERS, 'loggers', (None, None))
+    if parent is not logger:
+        child = logger.get_child(f'thread{next(_THREAD_IDS)}')
+        _THREAD_LOGGERS.loggers = (logger, child)
+
+    child.set_level(logger.level)
+    _CONTEXT_LOGGER.set(child)
 
 
 def set_log_level(level):
@@ -112,6 +155,80 @@ def set_log_format(**kwargs):
 
     _LOGGER.set_format(**kwargs)
 
+
+# While a batch of labels is being written in quiet mode, the Counter of their outcomes
+# and the batch's logger
+_BATCH_COUNTER = contextvars.ContextVar('pdstemplate_batch_counter', default=None)
+_BATCH_LOGGER = contextvars.ContextVar('pdstemplate_batch_logger', default=None)
+_BATCH_LOCK = threading.Lock()   # labels in one batch can be written by several threads
+_BATCH_IDS = itertools.count(1)
+
+
+@contextlib.contextmanager
+def quiet_logging(title='Writing labels', filepath=''):
+    """Context manager for low-overhead logging of a large batch of labels.
+
+    Within this context, the logging of each label collapses to counters. Labels are not
+    given their own tiers in the logging hierarchy and informational messages are not
+    formatted; only warnings and errors are logged. When the context exits, a single
+    summary is logged, including the number of labels with each outcome ("written",
+    "unchanged", etc.) and the number of warnings and errors. The counts returned by
+    :meth:`~PdsTemplate.write` and the template's ``fatal_count``, ``error_count``, and
+    ``warning_count`` attributes are unaffected.
+
+    Only the labels generated within this context are affected. The batch is logged by a
+    child of the current logger, so labels generated concurrently outside the batch, and
+    other batches, are logged as usual.
+
+    Example::
+
+        with quiet_logging('Writing labels', directory):
+            for (dictionary, label_path) in items:
+                template.write(dictionary, label_path)
+
+    Parameters:
+        title (str, optional): Title of the batch in the log.
+        filepath (str, Path, or FCPath, optional): Optional file path to include in the
+            title.
+
+    Yields:
+        collections.Counter: The number of labels with each outcome, updated as the
+        labels are written.
+    """
+
+    parent = get_logger()
+    logger = parent.get_child(f'batch{next(_BATCH_IDS)}')
+    counter = collections.Counter()
+    token = _BATCH_COUNTER.set(counter)
+    batch_token = _BATCH_LOGGER.set(logger)
+    logger_token = _CONTEXT_LOGGER.set(logger)
+    logger.open(title, filepath)
+    level = logger.level
+    logger.set_level(max(level, logging.WARNING))
+    try:
+        yield counter
+    finally:
+        logger.set_level(level)
+        if counter:
+            summary = ', '.join(f'{count} {outcome}' for (outcome, count)
+                                in sorted(counter.items()))
+        else:
+            summary = 'none'
+        logger.info('Labels: ' + summary, force=True)
+        logger.close()
+        _CONTEXT_LOGGER.reset(logger_token)
+        _BATCH_LOGGER.reset(batch_token)
+        _BATCH_COUNTER.reset(token)
+
+
+def _count_label(outcome):
+    """Count a label with the given outcome if quiet logging is in effect."""
+
+    counter = _BATCH_COUNTER.get()
+    if counter is not None:
+        with _BATCH_LOCK:
+            counter[outcome] += 1
+
 ##########################################################################################
 # Line terminator utility
 ##########################################################################################
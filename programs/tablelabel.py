@@ -184,9 +184,9 @@ def main():
 
     template = None
     if args.template:
-        template = PdsTemplate(args.template, crlf=True, upper_e=args.upper_e,
-                               preprocess=pds3_table_preprocessor, kwargs=kwargs,
-                               postprocess=pds3_syntax_checker)
+        template = PdsTemplate.get(args.template, crlf=True, upper_e=args.upper_e,
+                                   preprocess=pds3_table_preprocessor, kwargs=kwargs,
+                                   postprocess=pds3_syntax_checker)
         if args.dump:
             print(template.content)
 
@@ -222,9 +222,9 @@ def main():
 
             # If there's not a default template, each label is its own template
             if not args.template:
-                template = PdsTemplate(path, crlf=True, upper_e=args.upper_e,
-                                       preprocess=pds3_table_preprocessor, kwargs=kwargs,
-                                       postprocess=pds3_syntax_checker)
+                template = PdsTemplate.get(path, crlf=True, upper_e=args.upper_e,
+                                           preprocess=pds3_table_preprocessor,
+                                           kwargs=kwargs, postprocess=pds3_syntax_checker)
             if args.dump:
                 print(template.content)
 
@@ -233,7 +233,8 @@ def main():
             status = template.write(dictionary, path, mode=mode,
                                     backup=(not args.nobackup))
 
-            # Keep track of errors and warnings
+            # Keep track of errors and warnings; the template's own counts are not used
+            # because PdsTemplate.get() can share it with other callers
             errors += status[0]
             warnings += status[1]
 
@@ -2,6 +2,7 @@
 # tests/test_pds3table.py
 ##########################################################################################
 
+import concurrent.futures
 from contextlib import redirect_stdout
 import io
 import os
@@ -224,6 +225,17 @@ class Test_Pds3Table(unittest.TestCase):
 
         self.assertEqual(label, answer)
 
+        # Labels from different templates generated in parallel threads
+        covims_path = test_file_dir / 'COVIMS_0094_index.lbl'
+        covims = PdsTemplate(covims_path, preprocess=pds3_table_preprocessor,
+                             kwargs={'validate': False, 'numbers': True}, crlf=True)
+        covims_answer = covims.generate({}, covims_path)
+        sky_summary_path = test_file_dir / 'GO_0023_sky_summary.lbl'
+        jobs = [(covims, covims_path), (sky_summary, sky_summary_path)] * 2
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            labels = list(executor.map(lambda job: job[0].generate({}, job[1]), jobs))
+        self.assertEqual(labels, [covims_answer, answer] * 2)
+
         # Missing TABLE
         template_path = test_file_dir / 'sky_summary_template.txt'
         with template_path.open('rb') as f:
@@ -6,9 +6,12 @@ import os
 import pathlib
 import platform
 import re
+import shutil
+import struct
 import sys
 import tempfile
 import unittest
+from unittest import mock
 
 import pdslogger
 from filecache import FCPath
@@ -311,11 +314,11 @@ class Test_Predefined(unittest.TestCase):
 
         # RAISE
         T = PdsTemplate('t.xml', content='$RAISE(ValueError,"This is the ValueError")$\n')
-        V = '[[[ValueError(This is the ValueError) at t.xml:1]]]\n'
+        V = '[[[ValueError(This is the ValueError) at t.xml:1:1]]]\n'
         self.assertEqual(T.generate({}), V)
         self.assertEqual(T.error_count, 1)
 
-        V = 'This is the ValueError at t.xml:1'
+        V = 'This is the ValueError at t.xml:1:1'
         try:
             _ = T.generate({}, raise_exceptions=True)
             self.assertTrue(False, "This should have raised an exception but didn't")
@@ -789,7 +792,7 @@ class Test_Misc(unittest.TestCase):
         # Raised exceptions
         T = PdsTemplate('t.xml', content='$1/0$\n', xml=False)
         D = {}
-        V = '[[[ZeroDivisionError(division by zero) in 1/0 at t.xml:1]]]\n'
+        V = '[[[ZeroDivisionError(division by zero) in 1/0 at t.xml:1:1]]]\n'
         self.assertEqual(T.generate(D), V)
         self.assertEqual(T.generate(D, raise_exceptions=False), V)
 
@@ -818,10 +821,21 @@ class Test_Misc(unittest.TestCase):
         with self.assertRaises(ZeroDivisionError):
             T.generate(D, raise_exceptions=True)
 
+        # Every invalid expression is reported when the template is constructed
+        with self.assertRaises(TemplateError) as context:
+            T = PdsTemplate('t.xml', content=('$ 2*3$\n$1+$\n$FOR(x=a b)\n$END_FOR\n'
+                                              '$IF(ok)\n$ELSE_IF(@)\n$END_IF\n'
+                                              '$NOTE\n$1+$\n$END_NOTE\n'), xml=False)
+        self.assertEqual(str(context.exception),
+                         '3 invalid expressions: '
+                         'SyntaxError(invalid syntax (<string>, line 1)) in 1+ at t.xml:2:1; '
+                         'SyntaxError(invalid syntax (<string>, line 1)) in a b at t.xml:3; '
+                         'SyntaxError(invalid syntax (<string>, line 1)) in (@) at t.xml:6')
+
         # Mismatched $
         with self.assertRaises(TemplateError) as context:
             T = PdsTemplate('t.xml', content='$\n')
-        self.assertEqual(str(context.exception), 'Mismatched "$" at t.xml:1')
+        self.assertEqual(str(context.exception), 'Mismatched "$" at t.xml:1:1')
 
         # Float pretty-printing
         T = PdsTemplate('t.xml', content='$0.1+0.2$\n', xml=False)
@@ -993,7 +1007,7 @@ est laborum.
                 self.assertEqual(answer, (0, 0))
                 self.assertTrue(False, "This should have raised an exception but didn't")
             except ValueError as e:
-                self.assertEqual(str(e), 'This is the ValueError at raises_template.txt:1')
+                self.assertEqual(str(e), 'This is the ValueError at raises_template.txt:1:1')
                 self.assertEqual(T.error_count, 1)
 
         # Test writing files with different terminators
@@ -1153,3 +1167,1125 @@ class Test_Includes(unittest.TestCase):
             PdsTemplate._GETENV_INCLUDE_DIRS = None
             if original is not None:
                 os.environ['PDSTEMPLATE_INCLUDES'] = original
+
+
+class Test_Codegen(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        def both(content, dictionary={}, **kwargs):
+            T = PdsTemplate('t.xml', content=content, xml=False)
+            C = PdsTemplate('t.xml', content=content, xml=False, engine='codegen')
+            self.assertIsNotNone(C._renderer)
+            answer = T.generate(dictionary, **kwargs)
+            self.assertEqual(C.generate(dictionary, **kwargs), answer)
+            self.assertEqual((C.error_count, C.warning_count),
+                             (T.error_count, T.warning_count))
+            return answer
+
+        self.assertEqual(both('$a=1$ $$ $a+1$\n'), '1 $ 2\n')
+        self.assertEqual(both('$FOR(x, k, n=range(3))\n$k$/$n$:$x$\n$END_FOR\n'),
+                         '0/3:0\n1/3:1\n2/3:2\n')
+        self.assertEqual(both('$FOR(range(2))\n$FOR("ab")\n$VALUE$$INDEX$\n'
+                              '$END_FOR\n$END_FOR\n$VALUE$\n', {'VALUE': 7}),
+                         'a0\nb1\na0\nb1\n7\n')
+
+        template = ('$IF(x=a>2)\nbig $x$\n$ELSE_IF(y=a>1)\nmid $y$\n$ELSE_IF(a)\n'
+                    'small\n$ELSE\nzero\n$END_IF\n')
+        self.assertEqual(both(template, {'a': 3}), 'big True\n')
+        self.assertEqual(both(template, {'a': 2}), 'mid True\n')
+        self.assertEqual(both(template, {'a': 1}), 'small\n')
+        self.assertEqual(both(template, {'a': 0}), 'zero\n')
+        self.assertEqual(both('$IF(a)\n$END_IF\n', {'a': 1}), '')
+
+        self.assertEqual(both('$ONCE(b=2)\n$NOTE\nignored\n$END_NOTE\n$b$\n'), '2\n')
+        self.assertEqual(both('$ONCE(a=1/0)\n$a$\n', {'a': 1}),
+                         '[[[ZeroDivisionError(division by zero) in 1/0 at t.xml:1]]]')
+
+        # Errors inside headers do not unbalance the local dictionaries
+        self.assertEqual(both('$IF(1/0)\n$END_IF\n$a=5$\n$FOR(1/0)\n$END_FOR\n$a$\n'),
+                         '[[[ZeroDivisionError(division by zero) in (1/0) at t.xml:1]]]5\n'
+                         '[[[ZeroDivisionError(division by zero) in (1/0) at t.xml:4]]]'
+                         '5\n')
+
+        C = PdsTemplate('t.xml', content='$1/0$\n', engine='codegen')
+        self.assertRaises(ZeroDivisionError, C.generate, {}, raise_exceptions=True)
+
+        self.assertRaises(ValueError, PdsTemplate, 't.xml', content='', engine='jit')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Cache(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        content = ('$ONCE(a=3)\n$FOR(range(a))\n$VALUE$:$2*VALUE$\n$END_FOR\n'
+                   '$IF(a > 2)\nbig\n$ELSE\nsmall\n$END_IF\n$1/0$\n')
+        answer = ('0:0\n1:2\n2:4\nbig\n'
+                  '[[[ZeroDivisionError(division by zero) in 1/0 at t.xml:10:1]]]\n')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_dir = pathlib.Path(temp_dir) / 'cache'
+
+            T = PdsTemplate('t.xml', content=content, xml=False, cache_dir=cache_dir)
+            self.assertEqual(T.generate({}), answer)
+            files = list(cache_dir.iterdir())
+            self.assertEqual(len(files), 1)
+
+            # Second construction loads the blocks, bound to the new template
+            T2 = PdsTemplate('t.xml', content=content, xml=False, cache_dir=cache_dir)
+            self.assertIsNot(T2._blocks, T._blocks)
+            self.assertIs(T2._blocks[-1].template, T2)
+            self.assertEqual(T2.generate({}), answer)
+            self.assertEqual(list(cache_dir.iterdir()), files)
+
+            C = PdsTemplate('t.xml', content=content, xml=False, cache_dir=cache_dir,
+                            engine='codegen')
+            self.assertEqual(C.generate({}), answer)
+
+            # Different content or path gets a new entry
+            T3 = PdsTemplate('u.xml', content=content, xml=False, cache_dir=cache_dir)
+            self.assertEqual(T3.generate({}), answer.replace('t.xml', 'u.xml'))
+            self.assertEqual(len(list(cache_dir.iterdir())), 2)
+
+            # A damaged cache file is replaced
+            files[0].write_bytes(b'garbage')
+            T4 = PdsTemplate('t.xml', content=content, xml=False, cache_dir=cache_dir)
+            self.assertEqual(T4.generate({}), answer)
+            T5 = PdsTemplate('t.xml', content=content, xml=False, cache_dir=cache_dir)
+            self.assertEqual(T5.generate({}), answer)
+
+            # Environment variable
+            original = os.getenv('PDSTEMPLATE_CACHE')
+            try:
+                env_dir = pathlib.Path(temp_dir) / 'env'
+                os.environ['PDSTEMPLATE_CACHE'] = str(env_dir)
+                T = PdsTemplate('t.xml', content=content, xml=False)
+                self.assertEqual(len(list(env_dir.iterdir())), 1)
+                T = PdsTemplate('t.xml', content=content, xml=False, cache_dir='')
+                self.assertEqual(len(list(env_dir.iterdir())), 1)
+            finally:
+                if original is None:
+                    del os.environ['PDSTEMPLATE_CACHE']
+                else:
+                    os.environ['PDSTEMPLATE_CACHE'] = original
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_IncludeCache(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            include_path = temp_dir / 'inc.txt'
+            include_path.write_text('A=$a$\n')
+            content = '$INCLUDE(name)\nend\n'
+            dictionary = {'name': 'inc.txt', 'a': 1}
+
+            T = PdsTemplate(temp_dir / 't.lbl', content=content)
+            S = PdsTemplate(temp_dir / 't.lbl', content=content, include_cache='static')
+            N = PdsTemplate(temp_dir / 't.lbl', content=content, include_cache='off')
+            for template in (T, S, N):
+                self.assertEqual(template.generate(dictionary), 'A=1\nend\n')
+
+            blocks = T._include_cache[('inc.txt', str(T.template_path))][1]
+            self.assertEqual(T.generate(dictionary), 'A=1\nend\n')
+            self.assertIs(T._include_cache[('inc.txt', str(T.template_path))][1],
+                          blocks)
+            self.assertEqual(N._include_cache, {})
+
+            # A modified file is recompiled unless the cache is static
+            include_path.write_text('AA=$a$\n')
+            self.assertEqual(T.generate(dictionary), 'AA=1\nend\n')
+            self.assertEqual(S.generate(dictionary), 'A=1\nend\n')
+            self.assertEqual(N.generate(dictionary), 'AA=1\nend\n')
+
+            # A missing file is an error in every mode
+            include_path.unlink()
+            for template in (T, N):
+                self.assertEqual(template.generate(dictionary), '$INCLUDE(inc.txt)\n')
+                self.assertEqual(template.fatal_count, 1)
+
+        self.assertRaises(ValueError, PdsTemplate, 't.xml', content='',
+                          include_cache='yes')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_IncludeResolver(unittest.TestCase):
+
+    def runTest(self):
+
+        from pdstemplate._includes import _IncludeResolver
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            dir1 = temp_dir / 'dir1'
+            dir2 = temp_dir / 'dir2'
+            dir1.mkdir()
+            dir2.mkdir()
+            (dir2 / 'a.txt').write_text('A\n')
+            (dir2 / 'b.txt').write_text('B\n')
+
+            for listing in (False, True):
+                resolver = _IncludeResolver([FCPath(dir1), FCPath(dir2)],
+                                            listing=listing)
+                self.assertEqual(resolver.resolve('a.txt'), FCPath(dir2 / 'a.txt'))
+                self.assertEqual(resolver.read_text('a.txt'), 'A\n')
+                self.assertEqual(resolver._missing, {('a.txt', -1), ('a.txt', 0)})
+                self.assertRaises(FileNotFoundError, resolver.resolve, 'c.txt')
+
+                # Locations are remembered, so new files are not seen until forget()
+                (dir1 / 'a.txt').write_text('AA\n')
+                (dir1 / 'c.txt').write_text('C\n')
+                self.assertEqual(resolver.read_text('a.txt'), 'A\n')
+                resolver.forget('a.txt')
+                if listing:
+                    self.assertEqual(resolver.read_text('a.txt'), 'A\n')
+                    self.assertRaises(FileNotFoundError, resolver.resolve, 'c.txt')
+                else:
+                    self.assertEqual(resolver.read_text('a.txt'), 'AA\n')
+                    self.assertRaises(FileNotFoundError, resolver.resolve, 'c.txt')
+                    resolver.forget('c.txt')
+                    self.assertEqual(resolver.read_text('c.txt'), 'C\n')
+
+                (dir1 / 'a.txt').unlink()
+                (dir1 / 'c.txt').unlink()
+
+            # Unlistable directories are searched file by file
+            resolver = _IncludeResolver([FCPath(temp_dir / 'dir3'), FCPath(dir2)],
+                                        listing=True)
+            self.assertEqual(resolver.read_text('b.txt'), 'B\n')
+            self.assertIsNone(resolver._listings[0])
+
+            # Via the template
+            content = '$INCLUDE("a.txt")\n$INCLUDE(name)\n'
+            T = PdsTemplate(temp_dir / 't.lbl', content=content, includes=[dir1, dir2],
+                            list_includes=True)
+            self.assertEqual(T.generate({'name': 'b.txt'}), 'A\nB\n')
+            self.assertEqual(T.content, 'A\n$INCLUDE(name)\n')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Threads(unittest.TestCase):
+
+    def runTest(self):
+
+        import concurrent.futures
+        import time
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        content = ('$ONCE(pause())\n$LABEL_PATH()$ $TEMPLATE_PATH()$\n'
+                   '$ONCE(pause())\n$RAISE(ValueError, "bad") if bad else ""$'
+                   '$LABEL_PATH()$\n')
+        templates = [PdsTemplate(f't{k}.txt', content=content) for k in range(2)]
+
+        def job(k):
+            template = templates[k % 2]
+            dictionary = {'bad': k % 3 == 0, 'pause': lambda: time.sleep(0.002)}
+            label = template.generate(dictionary, f'label{k}.txt')
+            with tempfile.TemporaryDirectory() as temp_dir:
+                status = template.write(dictionary, pathlib.Path(temp_dir) / 'x.txt',
+                                        mode='validate')
+            return (label, status)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(job, range(24)))
+
+        for k, (label, status) in enumerate(results):
+            prefix = f'label{k}.txt t{k % 2}.txt\n'
+            if k % 3 == 0:
+                self.assertEqual(label, prefix + f'[[[ValueError(bad) at t{k % 2}.txt:4:1]]]'
+                                                 f'label{k}.txt\n')
+                self.assertEqual(status, (1, 0))
+            else:
+                self.assertEqual(label, prefix + f'label{k}.txt\n')
+                self.assertEqual(status, (0, 0))
+
+        # generate() is re-entrant
+        inner = PdsTemplate('inner.txt', content='$LABEL_PATH()$')
+        outer = PdsTemplate('outer.txt',
+                            content='$LABEL_PATH()$:$inner.generate({}, "b")$:'
+                                    '$LABEL_PATH()$:$TEMPLATE_PATH()$\n')
+        self.assertEqual(outer.generate({'inner': inner}, 'a'), 'a:b\n:a:outer.txt\n')
+        self.assertEqual(PdsTemplate.LABEL_PATH(), '')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_WriteMany(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        content = ('$FOR(range(n))\n$VALUE$:$LABEL_PATH().rpartition("/")[2]$\n'
+                   '$END_FOR\n$10//n$\n')
+        T = PdsTemplate('t.txt', content=content)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            items = [({'n': n}, temp_dir / f'label{n}.txt') for n in range(7)]
+
+            for jobs in (1, 3):
+                status = T.write_many(items, jobs=jobs)
+                self.assertEqual(status, [(1, 0)] + [(0, 0)] * 6)
+                self.assertFalse(items[0][1].exists())  # not saved after fatal error
+                for (dictionary, label_path) in items[1:]:
+                    n = dictionary['n']
+                    answer = ''.join(f'{k}:label{n}.txt\n' for k in range(n))
+                    answer += str(10//n) + '\n'
+                    self.assertEqual(label_path.read_text(), answer)
+                    label_path.unlink()
+
+            # Validation only
+            self.assertEqual(T.write_many(items[:3], jobs=2, mode='validate'),
+                             [(1, 0), (0, 0), (0, 0)])
+            self.assertEqual(list(temp_dir.iterdir()), [])
+
+        self.assertEqual(T.write_many([], jobs=4), [])
+        self.assertRaises(ValueError, T.write_many, [], mode='xxx')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Stream(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        content = ('A=$a$\n$FOR(range(n))\n$VALUE$:$LABEL_PATH().rpartition("/")[2]$\n'
+                   '$END_FOR\n$IF(n > 2)\nbig\n$ELSE\nsmall\n$END_IF\n$10//n$\n')
+        for (engine, crlf) in [(e, c) for e in ('interpret', 'codegen')
+                               for c in (False, True)]:
+            T = PdsTemplate('t.txt', content=content, engine=engine, crlf=crlf)
+            T._STREAM_FLUSH = 2         # flush after every iteration of the $FOR loop
+
+            # generate_iter yields the same content as generate, in pieces
+            for n in (0, 1, 4):
+                dictionary = {'a': 1.5, 'n': n}
+                chunks = list(T.generate_iter(dictionary, 'x.lbl'))
+                self.assertEqual(len(chunks) > 1, n > 0)
+                counts = (T.fatal_count, T.error_count, T.warning_count)
+                self.assertEqual(''.join(chunks), T.generate(dictionary, 'x.lbl'))
+                self.assertEqual(counts, (T.fatal_count, T.error_count,
+                                          T.warning_count))
+                self.assertEqual(T.fatal_count, int(n == 0))
+
+            # Interleaved generation of two labels
+            iter1 = T.generate_iter({'a': 1, 'n': 2}, 'a.lbl')
+            iter2 = T.generate_iter({'a': 2, 'n': 3}, 'b.lbl')
+            chunks1 = [next(iter1)]
+            chunks2 = list(iter2)
+            chunks1 += list(iter1)
+            self.assertEqual(''.join(chunks1), T.generate({'a': 1, 'n': 2}, 'a.lbl'))
+            self.assertEqual(''.join(chunks2), T.generate({'a': 2, 'n': 3}, 'b.lbl'))
+
+            # write(stream=True) matches write()
+            with tempfile.TemporaryDirectory() as temp_dir:
+                temp_dir = pathlib.Path(temp_dir)
+                path1 = temp_dir / 'label1.lbl'
+                path2 = temp_dir / 'label2.lbl'
+                for n in (0, 3):
+                    for mode in ('validate', 'save', 'repair'):
+                        status1 = T.write({'a': 1, 'n': n}, path1, mode=mode)
+                        status2 = T.write({'a': 1, 'n': n}, path2, mode=mode,
+                                          stream=True)
+                        self.assertEqual(status1, status2)
+                        self.assertEqual(path1.exists(), path2.exists())
+                        if path1.exists():
+                            self.assertEqual(path1.read_bytes().replace(b'label1',
+                                                                        b'label2'),
+                                             path2.read_bytes())
+                self.assertEqual(sorted(p.name for p in temp_dir.iterdir()),
+                                 ['label1.lbl', 'label2.lbl'])
+
+                # An exception leaves no temporary file behind
+                self.assertRaises(NameError, T.write, {'n': 3}, path2,
+                                  raise_exceptions=True, stream=True)
+                self.assertEqual(len(list(temp_dir.iterdir())), 2)
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Scopes(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        T = PdsTemplate('t.txt', content='$BASENAME(a)$:$len(a)$:$x$\n')
+        dictionary = {'a': 'dir/file.txt', 'x': 1}
+        self.assertEqual(T.generate(dictionary), 'file.txt:12:1\n')
+        self.assertEqual(dictionary, {'a': 'dir/file.txt', 'x': 1})
+
+        # The dictionary overrides predefined functions and builtins
+        dictionary = {'a': 'xyz', 'x': 2, 'BASENAME': str.upper, 'len': str.lower}
+        self.assertEqual(T.generate(dictionary), 'XYZ:xyz:2\n')
+
+        # A global defined during generation persists in later labels
+        T = PdsTemplate('t.txt', content='$DEFINE(y)$:$TEST_SCOPE_X$\n')
+        T2 = PdsTemplate('t2.txt', content='$TEST_SCOPE_X$\n')
+
+        def DEFINE(y):
+            PdsTemplate.define_global('TEST_SCOPE_X', y)
+            return y
+
+        self.assertEqual(T.generate({'DEFINE': DEFINE, 'y': 7}), '7:7\n')
+        self.assertEqual(T2.generate({}), '7\n')
+        self.assertEqual(T2.generate({'TEST_SCOPE_X': 8}), '8\n')
+
+        del PdsTemplate._PREDEFINED_FUNCTIONS['TEST_SCOPE_X']
+        del PdsTemplate._PREDEFINED_BUILTINS['TEST_SCOPE_X']
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_LazyFor(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        class Sized(object):
+            def __init__(self, n):
+                self.n = n
+
+            def __len__(self):
+                return self.n
+
+            def __iter__(self):
+                return iter(range(self.n))
+
+        consumed = []
+
+        def items(n):
+            for k in range(n):
+                consumed.append(k)
+                yield k
+
+        for engine in ('interpret', 'codegen'):
+
+            # LENGTH is not needed so the generator is consumed as the loop runs
+            T = PdsTemplate('t.txt', content='$FOR(items(n))\n$VALUE$\n$END_FOR\n',
+                            engine=engine)
+            self.assertFalse(T._blocks[0].uses_length)
+            self.assertEqual(T.generate({'items': items, 'n': 3}), '0\n1\n2\n')
+
+            T._STREAM_FLUSH = 1
+            consumed.clear()
+            chunks = T.generate_iter({'items': items, 'n': 1000})
+            self.assertEqual(next(chunks), '0\n')
+            self.assertEqual(consumed, [0])
+            self.assertEqual(len(''.join(chunks)), 3890 - 2)
+            self.assertEqual(len(consumed), 1000)
+
+            # LENGTH of a generator, a sized object, or a custom name
+            content = '$FOR(items(n))\n$VALUE$/$LENGTH$\n$END_FOR\n'
+            T = PdsTemplate('t.txt', content=content, engine=engine)
+            self.assertTrue(T._blocks[0].uses_length)
+            self.assertEqual(T.generate({'items': items, 'n': 2}), '0/2\n1/2\n')
+            self.assertEqual(T.generate({'items': Sized, 'n': 2}), '0/2\n1/2\n')
+
+            content = ('$FOR(v,k,n=items(2))\n$IF(k == n-1)\n$v$\n$END_IF\n$END_FOR\n'
+                       '$FOR(x)\n$VALUE$\n$END_FOR\n')
+            T = PdsTemplate('t.txt', content=content, engine=engine)
+            self.assertTrue(T._blocks[0].uses_length)
+            self.assertFalse(T._blocks[2].uses_length)
+            self.assertEqual(T.generate({'items': items, 'x': [5]}), '1\n5\n')
+
+            # A dynamic $INCLUDE might refer to LENGTH
+            T = PdsTemplate('t.txt', content='$FOR(x)\n$INCLUDE(name)\n$END_FOR\n',
+                            engine=engine)
+            self.assertTrue(T._blocks[0].uses_length)
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Folding(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        version = PdsTemplate.VERSION_ID()
+        content = ('a$$b$"xy"*2$\n$VERSION_ID()$:$BOOL(1 > 2)$:$x$\n'
+                   '$FOR(range(2))\nloop\n$END_FOR\n')
+        for engine in ('interpret', 'codegen'):
+            T = PdsTemplate('t.txt', content=content, engine=engine)
+            self.assertEqual(list(T._blocks[0].preprocessed),
+                             [f'a$bxyxy\n{version}:false:', ('x', '', 2, mock.ANY, 30), '\n'])
+            self.assertEqual(list(T._blocks[1].preprocessed), ['loop\n'])
+            self.assertEqual(T._folded_names, {'BOOL', 'VERSION_ID'})
+            answer = f'a$bxyxy\n{version}:false:1\nloop\nloop\n'
+            self.assertEqual(T.generate({'x': 1}), answer)
+
+            # Override a function used by a constant expression
+            self.assertEqual(T.generate({'x': 1, 'VERSION_ID': lambda: 'v9'}),
+                             'a$bxyxy\nv9:false:1\nloop\nloop\n')
+            self.assertEqual(T.generate({'x': 1}), answer)
+
+        # Redefine a function used by a constant expression after construction
+        T1 = PdsTemplate('t.txt', content='B = $BOOL(1)$\n')
+        T2 = PdsTemplate('t.txt', content='C = $len("abc")$\n')
+        self.assertEqual(T1.generate({}), 'B = true\n')
+        try:
+            PdsTemplate.define_global('BOOL', lambda value: 'OVERRIDE')
+            self.assertEqual(T1.generate({}), 'B = OVERRIDE\n')
+            self.assertEqual(PdsTemplate('t.txt', content='B = $BOOL(1)$\n').generate({}),
+                             'B = OVERRIDE\n')
+            self.assertEqual(T2.generate({}), 'C = 3\n')
+        finally:
+            PdsTemplate.define_global('BOOL', PdsTemplate.BOOL)
+        self.assertEqual(T1.generate({}), 'B = true\n')
+
+        # A name assigned in the template prevents folding
+        T = PdsTemplate('t.txt', content='$FOR(str=x)\n$str(1)$\n$END_FOR\n$len("ab")$\n')
+        self.assertEqual(len(T._blocks[0].preprocessed), 3)
+        self.assertEqual(list(T._blocks[1].preprocessed), ['2\n'])
+        self.assertEqual(T._folded_names, {'len'})
+        self.assertEqual(T.generate({'x': [lambda v: 'one']}), 'one\n2\n')
+
+        # Errors are reported when the label is generated
+        T = PdsTemplate('t.txt', content='$1//0$\n')
+        self.assertEqual(len(T._blocks[0].preprocessed), 3)
+        self.assertEqual(T.generate({}), '[[[ZeroDivisionError(integer division or '
+                                         'modulo by zero) in 1//0 at t.txt:1:1]]]\n')
+        self.assertEqual(T.fatal_count, 1)
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_RenderCache(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            cache = temp_dir / 'cache'
+
+            def cached_files():
+                return sorted(cache.glob('*/*.txt')) if cache.exists() else []
+
+            content = ('$FOR(v=items)\n$v$:$BASENAME(LABEL_PATH())$\n$END_FOR\n'
+                       '$VERSION_ID()$\n')
+            T = PdsTemplate('t.txt', content=content, render_cache=cache, crlf=True)
+            self.assertEqual(T._render_dependencies[0],
+                             ['BASENAME', 'LABEL_PATH', 'VERSION_ID', 'items', 'v'])
+            dictionary = {'items': [1, 2], 'unused': 0}
+            answer = T.generate(dictionary, 'a.lbl')
+            self.assertEqual(answer.count('\r\n'), 3)
+            files = cached_files()
+            self.assertEqual(len(files), 1)
+
+            # Replace the cached content to confirm it is used
+            files[0].write_bytes(b'cached\r\n')
+            self.assertEqual(T.generate(dictionary, 'a.lbl'), 'cached\r\n')
+            self.assertEqual(T.generate({'items': [1, 2], 'unused': 1}, 'a.lbl'),
+                             'cached\r\n')
+            self.assertEqual(T.generate({'items': [1, 2]}, 'b.lbl'),
+                             answer.replace('a.lbl', 'b.lbl'))
+            self.assertEqual(T.generate({'items': [1, 3]}, 'a.lbl'),
+                             answer.replace('2:', '3:'))
+            self.assertEqual(len(cached_files()), 3)
+
+            # A new template with the same content uses the same cache
+            T = PdsTemplate('t.txt', content=content, render_cache=cache, crlf=True)
+            label_path = temp_dir / 'a.lbl'
+            T.write(dictionary, label_path)
+            self.assertEqual(len(cached_files()), 4)
+            T.write(dictionary, label_path)
+            self.assertEqual(label_path.read_bytes(), answer.encode())
+            self.assertEqual(len(cached_files()), 4)
+
+            # Redefining a static function via define_global() changes the key
+            try:
+                PdsTemplate.define_global('BASENAME', lambda path: 'OVERRIDE')
+                self.assertEqual(T.generate(dictionary, 'a.lbl'),
+                                 answer.replace('a.lbl', 'OVERRIDE'))
+                self.assertEqual(len(cached_files()), 5)
+            finally:
+                PdsTemplate.define_global('BASENAME', PdsTemplate.BASENAME)
+            self.assertEqual(T.generate(dictionary, 'a.lbl'), 'cached\r\n')
+
+            # Labels with errors, impure functions, or unpicklable values are not cached
+            for (content, dictionary) in [('$1//x$\n', {'x': 0}),
+                                          ('$COUNTER("a")$\n', {}),
+                                          ('$f(1)$\n', {'f': lambda v: v}),
+                                          ('$undefined$\n', {})]:
+                shutil.rmtree(cache, ignore_errors=True)
+                T = PdsTemplate('t.txt', content=content, render_cache=cache)
+                T.generate(dictionary)
+                self.assertEqual(cached_files(), [])
+
+            # A dynamic $INCLUDE disables the render cache
+            T = PdsTemplate('t.txt', content='$INCLUDE(name)\n', render_cache=cache)
+            self.assertIsNone(T._render_dependencies)
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Sync(unittest.TestCase):
+
+    def runTest(self):
+
+        from pdstemplate._manifest import _Manifest
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        T = PdsTemplate('t.txt', content='$x$\n$1//y$\n')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            label_path = temp_dir / 'a.lbl'
+
+            for stream in (False, True):
+                for path in temp_dir.iterdir():
+                    path.unlink()
+
+                self.assertEqual(T.write({'x': 1, 'y': 1}, label_path, mode='sync',
+                                         stream=stream), (0, 0))
+                self.assertEqual(label_path.read_text(), '1\n1\n')
+                self.assertTrue((temp_dir / '.pdstemplate_manifest.sqlite').exists())
+
+                # Unchanged content is not rewritten
+                os.utime(label_path, ns=(0, 0))
+                manifest = _Manifest(temp_dir)
+                row = manifest.connection.execute('SELECT digest FROM labels')
+                manifest.record(label_path.name, row.fetchone()[0])
+                T.write({'x': 1, 'y': 1}, label_path, mode='sync', stream=stream)
+                self.assertEqual(label_path.stat().st_mtime_ns, 0)
+
+                # Changed content is written
+                T.write({'x': 2, 'y': 1}, label_path, mode='sync', stream=stream)
+                self.assertEqual(label_path.read_text(), '2\n1\n')
+                self.assertNotEqual(label_path.stat().st_mtime_ns, 0)
+
+                # A file modified by other means is rewritten
+                label_path.write_text('2\n1\n\n')
+                T.write({'x': 2, 'y': 1}, label_path, mode='sync', stream=stream)
+                self.assertEqual(label_path.read_text(), '2\n1\n')
+
+                # Not saved after a fatal error
+                self.assertEqual(T.write({'x': 3, 'y': 0}, label_path, mode='sync',
+                                         stream=stream), (1, 0))
+                self.assertEqual(label_path.read_text(), '2\n1\n')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_XmlEscape(unittest.TestCase):
+
+    def runTest(self):
+
+        from xml.sax.saxutils import escape
+
+        from pdstemplate._pdsblock import _PdsBlock
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        class Obj(object):
+            def __str__(self):
+                return 'a<b>&c'
+
+        for value in ['plain', 'a&b', '<x>', '&&<<>>', '', 'é<ü>', 'a&amp;b', Obj(),
+                      ['x<y'], 12, True, -3]:
+            self.assertEqual(_PdsBlock.format_value(value, True, False),
+                             escape(str(value)))
+            self.assertEqual(_PdsBlock.format_value(value, False, False), str(value))
+
+        self.assertEqual(_PdsBlock.format_value(1.5, True, False), '1.5')
+        self.assertEqual(_PdsBlock.format_value(PdsTemplate.NOESCAPE('<a>&'), True,
+                                                False), '<a>&')
+
+        T = PdsTemplate('t.xml', content='<a>$x$</a>\n<b>$NOESCAPE(x)$</b>\n', xml=True)
+        self.assertEqual(T.generate({'x': 'i<j'}), '<a>i&lt;j</a>\n<b>i<j</b>\n')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+def _original_pretty_truncate(value, upper_e):
+    """The original implementation of _PdsBlock._pretty_truncate(), for comparison."""
+
+    ZEROS = re.compile(r'(.*[.1-9])0{10,99}[1-9]\d*')
+    NINES = re.compile(r'(.*\.\d+9{10,99})[0-8]\d*')
+
+    str_value = str(value)
+    (mantissa, e, exponent) = str_value.partition('e')
+    if upper_e:
+        e = e.upper()
+    if mantissa.endswith('.0'):
+        return mantissa[:-1] + e + exponent
+    if '.' not in mantissa:
+        return mantissa + '.' + e + exponent
+    match = ZEROS.fullmatch(mantissa)
+    if match:
+        return match.group(1) + e + exponent
+    match = NINES.fullmatch(mantissa)
+    if not match:
+        return str_value
+    offset_str = match.group(1)
+    for c in '123456789':
+        offset_str = offset_str.replace(c, '0')
+    offset_str = offset_str[:-1] + '1'
+    value = float(match.group(1)) + float(offset_str)
+    return str(value).rstrip('0') + e + exponent
+
+
+class Test_PrettyTruncate(unittest.TestCase):
+
+    def runTest(self):
+
+        import math
+        import random
+
+        from pdstemplate._pdsblock import _PdsBlock
+
+        values = [0., -0., 1., -1., 0.1, 1/3, 2/3, 1.e300, 5.e-324, math.inf, -math.inf,
+                  math.nan, 1.0000000000000002, 0.9999999999999999, 123.00000000000001,
+                  -2.9999999999999996, 1.e22, 1.e-7, 12345678.999999999]
+        rng = random.Random(20251017)
+        for _ in range(20000):
+            mode = rng.randrange(4)
+            if mode == 0:               # arbitrary magnitude and precision
+                value = rng.uniform(-1, 1) * 10.**rng.randrange(-30, 30)
+            elif mode == 1:             # nearly a short decimal, from above or below
+                value = round(rng.uniform(-1000, 1000), rng.randrange(6))
+                value = math.nextafter(value, rng.choice([-math.inf, math.inf]))
+            elif mode == 2:             # a sum of short decimals, e.g., 0.1 + 0.2
+                value = (round(rng.uniform(-10, 10), 2) + round(rng.uniform(-10, 10), 2))
+            else:                       # random bits
+                bits = rng.getrandbits(64)
+                value = struct.unpack('d', struct.pack('Q', bits))[0]
+            values.append(value)
+
+        for value in values + values:   # the second pass uses the memo
+            for upper_e in (False, True):
+                self.assertEqual(_PdsBlock._pretty_truncate(value, upper_e),
+                                 _original_pretty_truncate(value, upper_e), repr(value))
+
+
+class Test_Terminator(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        content = ('$WRAP(0, 12, "one two three four five")$\n'
+                   '$WRAP(0, 12, text)$\n'
+                   '$FOR(x=items)\n<$x$>\n$END_FOR\n'
+                   '$IF(undefined)\nno\n$END_IF\n'
+                   '$INCLUDE(name)\n'
+                   'end$$\n')
+        dictionary = {'text': 'six seven eight nine ten', 'items': ['a\nb', 1.5],
+                      'name': 'missing.txt'}
+        for engine in ('interpret', 'codegen'):
+            received = []
+            T = PdsTemplate('t.txt', content=content, crlf=False, engine=engine)
+            answer = T.generate(dictionary)
+            self.assertEqual(answer.count('\n'), 10)
+            self.assertNotIn('\r', answer)
+
+            T = PdsTemplate('t.txt', content=content, crlf=True, engine=engine,
+                            postprocess=received.append)
+            crlf_answer = answer.replace('\n', '\r\n')
+            self.assertEqual(T.generate(dictionary), crlf_answer)
+            self.assertEqual(''.join(T.generate_iter(dictionary)), crlf_answer)
+            self.assertEqual(received, [answer, answer])    # postprocess gets <LF>
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_QuietLogging(unittest.TestCase):
+
+    def runTest(self):
+
+        import io
+        import logging
+
+        from pdstemplate import utils
+        from pdstemplate.utils import quiet_logging
+
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        PdsTemplate.get_logger().add_handler(handler)
+
+        content = '$FOR(range(n))\n$VALUE$\n$END_FOR\n$10//n$\n'
+        T = PdsTemplate('t.txt', content=content)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            items = [({'n': n}, temp_dir / f'label{n}.txt') for n in range(4)]
+            expected = T.write_many(items, jobs=1)
+            self.assertEqual(expected, [(1, 0), (0, 0), (0, 0), (0, 0)])
+            self.assertIn('Label written', stream.getvalue())
+
+            stream.seek(0)
+            stream.truncate()
+            with quiet_logging('Batch', temp_dir) as counter:
+                status = [T.write(dictionary, label_path, mode='repair')
+                          for (dictionary, label_path) in items]
+                self.assertEqual((T.fatal_count, T.error_count), (0, 0))
+                T.write({'n': 0}, items[0][1])
+                self.assertEqual((T.fatal_count, T.error_count), (1, 0))
+
+            self.assertEqual(status, expected)
+            self.assertEqual(counter, {'not repaired': 1, 'unchanged': 3, 'not saved': 1})
+            log = stream.getvalue()
+            self.assertNotIn('Generating label', log)
+            self.assertNotIn('Repair unnecessary', log)
+            self.assertEqual(log.count('ZeroDivisionError'), 2)
+            self.assertIn('Labels: 1 not repaired, 1 not saved, 3 unchanged', log)
+            self.assertEqual(log.count('Completed: Batch'), 1)
+
+            # write_many, with and without worker processes
+            for path in temp_dir.iterdir():
+                path.unlink()
+            for jobs in (1, 2):
+                stream.seek(0)
+                stream.truncate()
+                self.assertEqual(T.write_many(items, jobs=jobs, mode='sync', quiet=True),
+                                 expected)
+                log = stream.getvalue()
+                if jobs == 1:
+                    self.assertIn('Labels: 1 not saved, 3 written', log)
+                    self.assertIn('SUMMARY | 1 EXCEPTION message\n', log)
+                else:
+                    self.assertIn('Labels: 1 not saved, 3 unchanged', log)
+                    # The error was logged by a worker process but is counted here
+                    self.assertIn('SUMMARY | 0 ERROR messages reported of 1 total', log)
+                self.assertNotIn('Label written', log)
+
+            # Labels written outside the batch, here in another thread, are logged as usual
+            import concurrent.futures
+            stream.seek(0)
+            stream.truncate()
+            level = PdsTemplate.get_logger().level
+            with quiet_logging('Batch'):
+                T.write({'n': 1}, items[1][1])
+                with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                    executor.submit(T.write, {'n': 2}, items[2][1]).result()
+                self.assertEqual(utils._LOGGER.level, level)
+            self.assertEqual(stream.getvalue().count('Label re-written'), 1)
+            self.assertIn('Label re-written: ' + str(items[2][1]), stream.getvalue())
+            self.assertEqual(PdsTemplate.get_logger().level, level)
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Profile(unittest.TestCase):
+
+    def runTest(self):
+
+        import io
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        content = ('A=$f(1)$\n$FOR(x=range(3))\nv=$x*2$\n$END_FOR\n'
+                   '$IF(a)\nyes $$\n$END_IF\n')
+        dictionary = {'f': lambda x: 'x' * 100, 'a': True}
+        for engine in ('interpret', 'codegen'):
+            T = PdsTemplate('t.txt', content=content, engine=engine)
+            answer = T.generate(dictionary)
+            self.assertEqual(T._profile.stats, {})
+
+            stream = io.StringIO()
+            with T.profiling(file=stream):
+                self.assertTrue(T.profile)
+                self.assertEqual(T.generate(dictionary), answer)
+                self.assertEqual(T.generate(dictionary), answer)
+            self.assertFalse(T.profile)
+
+            stats = T._profile.stats
+            self.assertEqual(stats['t.txt', 1, 'EXPR', 'f(1)'][0], 2)
+            self.assertEqual(stats['t.txt', 1, 'EXPR', 'f(1)'][3], 200)
+            self.assertEqual(stats['t.txt', 0, '$ONCE', ''][3], 2 * 103)
+            self.assertEqual(stats['t.txt', 2, 'EXPR', 'range(3)'][0], 2)
+            self.assertEqual(stats['t.txt', 3, 'EXPR', 'x*2'][0], 6)
+            self.assertEqual(stats['t.txt', 3, 'EXPR', 'x*2'][3], 6)
+            self.assertEqual(stats['t.txt', 2, '$FOR', ''][0], 6)
+            self.assertEqual(stats['t.txt', 5, '$IF', ''][3], 2 * len('yes $\n'))
+            for (count, total, max_, size) in stats.values():
+                self.assertTrue(0 <= max_ <= total)
+
+            report = stream.getvalue()
+            self.assertEqual(report, T.profile_report())
+            self.assertEqual(len(report.splitlines()), len(stats) + 1)
+            self.assertEqual(len(T.profile_report(limit=3).splitlines()), 4)
+            self.assertIn('t.txt:1 EXPR f(1)', report)
+
+            totals = [float(line.split()[0]) for line in report.splitlines()[1:]]
+            self.assertEqual(totals, sorted(totals, reverse=True))
+
+            T.profile_report(reset=True)
+            self.assertEqual(T._profile.stats, {})
+            T.generate(dictionary)
+            self.assertEqual(T._profile.stats, {})
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_UndefinedNames(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        content = ('$a + BASENAME(b)$\n$FOR(x=items)\n$x$ $VALUE$ $LENGTH$ $y=z$\n'
+                   '$[q for q in w]$ $(lambda k: k + m)(1)$\n$END_FOR\n'
+                   '$NOTE\n$hidden$\n$END_NOTE\n$IF(c)\n$y$ $hide_warnings$\n$END_IF\n'
+                   '$INCLUDE(name)\n')
+        T = PdsTemplate('t.txt', content=content)
+        self.assertEqual(T.undefined_names(),
+                         ['VALUE', 'a', 'b', 'c', 'items', 'm', 'name', 'w', 'z'])
+
+        T = PdsTemplate('t.txt', content='$LABEL_PATH()$ $len("abc")$\n')
+        self.assertEqual(T.undefined_names(), [])
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Tokenize(unittest.TestCase):
+
+    def runTest(self):
+
+        import io
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        # Line numbers are those of the template, including after comment-only records
+        content = ('$NOTE: comment\nA = $a$   $NOTE: comment\n  $NOTE: comment\n'
+                   'B = $x$ $1/0$\n$IF(True)  \nC = $(1 +\n2)$\n$END_IF\n')
+        T = PdsTemplate('t.txt', content=content)
+        self.assertEqual([block.line for block in T._blocks], [0, 5, 8])
+        self.assertEqual([item[2::2] for item in T._blocks[0].preprocessed if
+                          isinstance(item, tuple)], [(2, 5), (4, 5), (4, 9)])
+        answer = ('A = 1\n\nB = X [[[ZeroDivisionError(division by zero) in 1/0 '
+                  'at t.txt:4:9]]]\nC = 3\n')
+        self.assertEqual(T.generate({'a': 1, 'x': 'X'}), answer)
+
+        # Errors during generation are reported by line and column too
+        for engine in ('interpret', 'codegen'):
+            T = PdsTemplate('t.txt', content=content, engine=engine)
+            self.assertEqual(T.generate({'a': 1, 'x': 'X'}), answer)
+            with T.profiling(file=io.StringIO()):
+                self.assertEqual(T.generate({'a': 1, 'x': 'X'}), answer)
+            with self.assertRaises(ZeroDivisionError) as context:
+                T.generate({'a': 1, 'x': 'X'}, raise_exceptions=True)
+            self.assertEqual(str(context.exception), 'division by zero in 1/0 at t.txt:4:9')
+
+        # Invalid expressions and mismatched "$" are reported by line and column
+        with self.assertRaises(TemplateError) as context:
+            PdsTemplate('t.txt', content='A\nB = $x$ $1+$\n')
+        self.assertEqual(str(context.exception),
+                         '1 invalid expression: SyntaxError(invalid syntax (<string>, '
+                         'line 1)) in 1+ at t.txt:2:9')
+
+        with self.assertRaises(TemplateError) as context:
+            PdsTemplate('t.txt', content='$FOR(x=a)\nB = $x$ $y\n$END_FOR\n')
+        self.assertEqual(str(context.exception), 'Mismatched "$" at t.txt:2:9')
+
+        # A header must occupy its own record
+        T = PdsTemplate('t.txt', content='$IF(x)$ A\n  $ELSE$\n')
+        self.assertEqual(T.generate({'IF': lambda x: 'if', 'x': 1, 'ELSE': 'else'}),
+                         'if A\n  else\n')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_ContentLine(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        T = PdsTemplate('t.txt', content='A = $a$\n\nC = $1/x$\n$FOR(x=[0])\nD\n$END_FOR')
+        self.assertEqual([T._content_line(k) for k in range(8)],
+                         ['', 'A = $a$', '', 'C = $1/x$', '$FOR(x=[0])', 'D', '$END_FOR',
+                          ''])
+
+        block = T._blocks[0]
+        self.assertEqual(block._more_error_info(3), '')
+        T._include_more_error_info = True
+        self.assertEqual(block._more_error_info(3), '    3: C = $1/x$')
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Registry(unittest.TestCase):
+
+    def runTest(self):
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        PdsTemplate.set_registry_size(0)
+        PdsTemplate.set_registry_size(3)
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                path = pathlib.Path(temp_dir) / 't.txt'
+                path.write_text('A = $a$\n')
+                os.utime(path, ns=(0, 0))
+
+                T = PdsTemplate.get(path)
+                self.assertIs(PdsTemplate.get(str(path)), T)
+                self.assertIsNot(PdsTemplate.get(path, crlf=True), T)
+                self.assertEqual(T.generate({'a': 1}), 'A = 1\n')
+
+                # A modified file is read again
+                path.write_text('A = $a$ $a$\n')
+                os.utime(path, ns=(0, 0))
+                T2 = PdsTemplate.get(path)
+                self.assertIsNot(T2, T)
+                self.assertEqual(T2.generate({'a': 1}), 'A = 1 1\n')
+
+                # In-memory content is keyed by its digest
+                C = PdsTemplate.get('c.txt', content='C = $c$\n')
+                self.assertIs(PdsTemplate.get('c.txt', content=['C = $c$\n']), C)
+                self.assertIsNot(PdsTemplate.get('c.txt', content='C = $c$ \n'), C)
+
+                # The least recently used template is discarded
+                self.assertEqual(len(PdsTemplate._REGISTRY), 3)
+                self.assertIs(PdsTemplate.get(path), T2)
+                PdsTemplate.get('d.txt', content='D\n')
+                self.assertIs(PdsTemplate.get(path), T2)
+                self.assertIsNot(PdsTemplate.get('c.txt', content='C = $c$\n'), C)
+
+                # A missing file is reported by the constructor
+                with self.assertRaises(FileNotFoundError):
+                    PdsTemplate.get(pathlib.Path(temp_dir) / 'missing.txt')
+        finally:
+            PdsTemplate.set_registry_size(32)
+
+        self.assertEqual(len(PdsTemplate._REGISTRY), 3)
+
+        PdsTemplate.get_logger().remove_all_handlers()
+
+
+class Test_Async(unittest.TestCase):
+
+    def runTest(self):
+
+        import asyncio
+        import io
+        import logging
+        import threading
+        import time
+
+        from pdstemplate.utils import quiet_logging
+
+        # No logging to stdout
+        PdsTemplate.get_logger().add_handler(pdslogger.NULL_HANDLER)
+
+        # Record the number of labels being generated at the same time
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def WAIT(value):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return value
+
+        T = PdsTemplate('t.txt', content='A = $WAIT(a)$\n$1//a$\n')
+        D = {'a': 2, 'WAIT': WAIT}
+        self.assertEqual(asyncio.run(T.agenerate(D)), 'A = 2\n0\n')
+        with self.assertRaises(ZeroDivisionError):
+            asyncio.run(T.agenerate({'a': 0, 'WAIT': WAIT}, raise_exceptions=True))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_dir = pathlib.Path(temp_dir)
+            self.assertEqual(asyncio.run(T.awrite(D, temp_dir / 'a.lbl')), (0, 0))
+            self.assertEqual((temp_dir / 'a.lbl').read_text(), 'A = 2\n0\n')
+
+            items = [({'a': k, 'WAIT': WAIT}, temp_dir / f'{k}.lbl') for k in range(7)]
+            active[1] = 0
+            results = asyncio.run(T.awrite_many(items, jobs=3))
+            self.assertEqual(results, [(1, 0)] + 6 * [(0, 0)])
+            self.assertEqual(active[1], 3)
+            for k in range(1, 7):
+                self.assertEqual((temp_dir / f'{k}.lbl').read_text(),
+                                 f'A = {k}\n{1//k}\n')
+
+            # Quiet logging counts every label, including those written concurrently
+            results = asyncio.run(T.awrite_many(items, mode='validate', quiet=True))
+            self.assertEqual(results, [(1, 0)] + 6 * [(0, 0)])
+            with quiet_logging() as counter:
+                asyncio.run(T.awrite_many(items, mode='validate'))
+            self.assertEqual(counter, {'valid': 6, 'invalid': 1})
+
+            # The batch summary includes the errors logged by each thread
+            stream = io.StringIO()
+            handler = logging.StreamHandler(stream)
+            PdsTemplate.get_logger().add_handler(handler)
+            asyncio.run(T.awrite_many(items, quiet=True))
+            PdsTemplate.get_logger().remove_handler(handler)
+            log = stream.getvalue()
+            self.assertIn('SUMMARY | 1 EXCEPTION message\n', log)
+            self.assertIn('SUMMARY | 1 ERROR message\n', log)
+
+            with self.assertRaises(ValueError):
+                asyncio.run(T.awrite_many(items, mode='bad'))
+
+            # After an exception, no more labels are written, even later
+            for path in temp_dir.iterdir():
+                path.unlink()
+            items = [({'a': k + 1, 'WAIT': WAIT}, temp_dir / f'{k}.lbl')
+                     for k in range(10)]
+            items[2][0].update({'a': 0, 'WAIT': lambda value: value})
+
+            # The event loop keeps running after the exception is caught
+            async def write_and_wait(quiet):
+                try:
+                    await T.awrite_many(items, jobs=2, raise_exceptions=True, quiet=quiet)
+                except ZeroDivisionError:
+                    written = sorted(path.name for path in temp_dir.iterdir())
+                    self.assertEqual(active[0], 0)
+                    await asyncio.sleep(0.2)
+                    return written
+                self.fail('ZeroDivisionError not raised')
+
+            for quiet in (False, True):
+                written = asyncio.run(write_and_wait(quiet))
+                self.assertEqual(written, ['0.lbl', '1.lbl', '3.lbl'])
+                self.assertEqual(sorted(path.name for path in temp_dir.iterdir()),
+                                 written)
+                for path in temp_dir.iterdir():
+                    path.unlink()
+
+        PdsTemplate.get_logger().remove_all_handlers()